@@ -0,0 +1,58 @@
+# python/ai/_embed_cache.py
+"""
+Shared corpus embeddings for the training scripts.
+
+The categorizer, emotion and intent trainers all encode the same text
+column of the same CSV. The first run encodes it once and saves the matrix
+as embeddings_<key>.npy next to the CSV; later runs memory-map that file
+and never load the transformer.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def _cache_path(csv_path: str, text_col: str) -> str:
+    """Cache file keyed by CSV mtime, text column and model"""
+    key = f"{os.path.getmtime(csv_path)}:{text_col}:{MODEL_NAME}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), f"embeddings_{digest}.npy")
+
+
+def get_embeddings(csv_path: str, text_col: str, label_cols=()):
+    """
+    Returns (X, df): the (len(df), 384) float32 embedding matrix of
+    df[text_col] and a DataFrame holding only text_col and label_cols.
+    """
+    df = pd.read_csv(csv_path, usecols=[text_col, *label_cols], engine="pyarrow")
+    cache_path = _cache_path(csv_path, text_col)
+
+    if os.path.exists(cache_path):
+        print(f"Loading cached embeddings ({os.path.basename(cache_path)})...")
+        X = np.load(cache_path, mmap_mode="r")
+        if X.shape[0] == len(df):
+            return X, df
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    print("Loading embedding model...")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = SentenceTransformer(MODEL_NAME, device=device)
+
+    print("Encoding texts...")
+    X = model.encode(
+        df[text_col].astype(str).tolist(),
+        batch_size=256,
+        convert_to_numpy=True,
+        show_progress_bar=True,
+        normalize_embeddings=False
+    ).astype(np.float32)
+
+    np.save(cache_path, X)
+    return X, df
@@ -4,16 +4,22 @@ Adaptive Categorizer - Uses user feedback for real-time learning
 Extends SemanticCategorizer with user-specific keyword learning
 """
 
+import asyncio
 import os
 import sys
+import threading
 from typing import Dict, List, Optional
 
+from cachetools import TTLCache
+
 # Add parent directory to path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
 from ai.categorizer import SemanticCategorizer
+from ai.keyword_matcher import KeywordMatcher
+from ai.result_cache import ResultCache
 
 
 class AdaptiveCategorizer(SemanticCategorizer):
@@ -21,11 +27,26 @@ class AdaptiveCategorizer(SemanticCategorizer):
     Adaptive categorizer that learns from user feedback.
     Loads user-specific keywords from MongoDB and uses them for categorization.
     """
+
+    # Bounded per-user caches: entries expire so memory stays capped and
+    # keywords learned by another worker are eventually picked up
+    CACHE_MAXSIZE = 10_000
+    CACHE_TTL_SECONDS = 300
+    # Whole categorize() results per user, keyed by (text, threshold);
+    # merchants repeat a lot
+    RESULT_CACHE_PER_USER = 256
     
     def __init__(self):
         super().__init__()
         # Will be set when we have database access
-        self.user_keywords_cache = {}
+        self.user_keywords_cache = TTLCache(maxsize=self.CACHE_MAXSIZE, ttl=self.CACHE_TTL_SECONDS)
+        self.user_matcher_cache = TTLCache(maxsize=self.CACHE_MAXSIZE, ttl=self.CACHE_TTL_SECONDS)
+        # TTLCache is not thread-safe (sync routes run in a threadpool)
+        self._cache_lock = threading.Lock()
+        # user_id -> ResultCache of that user's categorize() results. Dropped
+        # (one pop) whenever the user's keywords (re)load, so a learned
+        # keyword takes effect within one keyword TTL
+        self._categorize_cache = TTLCache(maxsize=self.CACHE_MAXSIZE, ttl=self.CACHE_TTL_SECONDS)
         self._db_initialized = False
     
     def _init_db(self):
@@ -34,8 +55,9 @@ class AdaptiveCategorizer(SemanticCategorizer):
             return
         
         try:
-            from backend.database import user_categories_col
+            from backend.database import user_categories_col, async_user_categories_col
             self.user_categories_col = user_categories_col
+            self.async_user_categories_col = async_user_categories_col
             self._db_initialized = True
         except Exception as e:
             print(f"Warning: Could not initialize database for adaptive learning: {e}")
@@ -53,37 +75,96 @@ class AdaptiveCategorizer(SemanticCategorizer):
             return {}
         
         # Check cache first
-        if user_id in self.user_keywords_cache:
-            return self.user_keywords_cache[user_id]
+        with self._cache_lock:
+            cached = self.user_keywords_cache.get(user_id)
+        if cached is not None:
+            return cached
         
         try:
-            # Load all user categories
-            user_categories = list(self.user_categories_col.find({"user_id": user_id}))
-            
-            # Build keyword map
-            learned_keywords = {}
-            for uc in user_categories:
-                category = uc.get("category", "").lower()
-                keywords = uc.get("keywords", [])
-                if category and keywords:
-                    learned_keywords[category] = [kw.lower() for kw in keywords if kw]
-            
-            # Cache for this session
-            self.user_keywords_cache[user_id] = learned_keywords
-            return learned_keywords
+            # Load all user categories (only the fields we use)
+            user_categories = list(self.user_categories_col.find(
+                {"user_id": user_id},
+                {"category": 1, "keywords": 1, "_id": 0}
+            ))
+            return self._cache_user_keywords(user_id, user_categories)
             
         except Exception as e:
             print(f"Error loading user keywords: {e}")
             return {}
+
+    async def _load_user_keywords_async(self, user_id: str) -> Dict[str, List[str]]:
+        """
+        Async variant of _load_user_keywords (Motor) - does not block the event loop.
+        """
+        if not self._db_initialized:
+            self._init_db()
+
+        if not self._db_initialized:
+            return {}
+
+        with self._cache_lock:
+            cached = self.user_keywords_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        try:
+            cursor = self.async_user_categories_col.find(
+                {"user_id": user_id},
+                {"category": 1, "keywords": 1, "_id": 0}
+            )
+            user_categories = await cursor.to_list(length=None)
+            return self._cache_user_keywords(user_id, user_categories)
+
+        except Exception as e:
+            print(f"Error loading user keywords: {e}")
+            return {}
+
+    def _cache_user_keywords(self, user_id: str, user_categories: List[Dict]) -> Dict[str, List[str]]:
+        """Build the keyword map from user_categories docs and cache it"""
+        learned_keywords = {}
+        for uc in user_categories:
+            category = uc.get("category", "").lower()
+            keywords = uc.get("keywords", [])
+            if category and keywords:
+                learned_keywords[category] = [kw.lower() for kw in keywords if kw]
+
+        # Cache for this session (with a matcher built over the keywords)
+        matcher = KeywordMatcher(learned_keywords)
+        with self._cache_lock:
+            self.user_keywords_cache[user_id] = learned_keywords
+            self.user_matcher_cache[user_id] = matcher
+            # Results cached against the previous keyword set may be stale
+            self._categorize_cache.pop(user_id, None)
+        return learned_keywords
     
     def _clear_user_cache(self, user_id: Optional[str] = None):
         """Clear cache for a specific user or all users"""
-        if user_id:
-            self.user_keywords_cache.pop(user_id, None)
-        else:
-            self.user_keywords_cache.clear()
+        with self._cache_lock:
+            if user_id:
+                self.user_keywords_cache.pop(user_id, None)
+                self.user_matcher_cache.pop(user_id, None)
+                self._categorize_cache.pop(user_id, None)
+            else:
+                self.user_keywords_cache.clear()
+                self.user_matcher_cache.clear()
+                self._categorize_cache.clear()
+
+    def _user_results(self, user_id: Optional[str]) -> ResultCache:
+        """The user's categorize() result cache, created on first use"""
+        with self._cache_lock:
+            results = self._categorize_cache.get(user_id)
+            if results is None:
+                results = ResultCache(maxsize=self.RESULT_CACHE_PER_USER)
+                self._categorize_cache[user_id] = results
+        return results
     
-    def categorize(self, text: str, user_id: Optional[str] = None, threshold: float = 0.45):
+    def categorize(
+        self,
+        text: str,
+        user_id: Optional[str] = None,
+        threshold: float = 0.45,
+        embedding=None
+    ):
         """
         Categorize text with adaptive learning.
         Uses both static keywords and user-learned keywords.
@@ -92,7 +173,39 @@ class AdaptiveCategorizer(SemanticCategorizer):
             text: Transaction text to categorize
             user_id: Optional user ID to load user-specific keywords
             threshold: Confidence threshold
+            embedding: Optional pre-computed embedding for the text
         """
+        # Lowercase once; reused by learned and static keyword matching.
+        # Keywords match substrings of exactly this text, so it is the key.
+        text_lower = text.lower()
+        key = (text_lower, threshold)
+        if user_id:
+            # (Re)loading keywords drops the user's results, so load first;
+            # a no-op while they are cached
+            self._load_user_keywords(user_id)
+        # Held for the whole call: if the user's keywords reload meanwhile,
+        # the result lands in the dropped cache instead of the new one
+        results = self._user_results(user_id)
+        cached = results.get(key)
+        if cached is not None:
+            return cached
+
+        result = self.match_keywords(text, user_id, text_lower=text_lower)
+        if not result:
+            # No keyword hit: semantic similarity
+            result = self.semantic_categorize(text, threshold, embedding)
+
+        results.set(key, result)
+        return result
+
+    def match_keywords(self, text: str, user_id: Optional[str] = None, *, text_lower: Optional[str] = None):
+        """
+        Learned keywords first, then static keywords. No embedding is computed;
+        returns None when neither matches.
+        """
+        if text_lower is None:
+            text_lower = text.lower()
+
         # Load user keywords if user_id provided
         user_keywords = {}
         if user_id:
@@ -100,22 +213,62 @@ class AdaptiveCategorizer(SemanticCategorizer):
         
         # Check user-learned keywords first (higher priority)
         if user_keywords:
-            text_lower = text.lower()
-            for category, keywords in user_keywords.items():
-                for keyword in keywords:
-                    if keyword in text_lower:
-                        return {
-                            "category": category,
-                            "confidence": 0.98,  # High confidence for learned keywords
-                            "method": "learned_keyword",
-                            "needs_user_confirmation": False,
-                            "alternatives": [],
-                            "learned": True  # Flag to indicate this was learned
-                        }
-        
-        # Fall back to parent class (static keywords + semantic)
-        return super().categorize(text, threshold)
+            with self._cache_lock:
+                matcher = self.user_matcher_cache.get(user_id)
+            if matcher is None:
+                matcher = KeywordMatcher(user_keywords)
+                with self._cache_lock:
+                    self.user_matcher_cache[user_id] = matcher
+
+            category = matcher.match(text_lower)
+            if category:
+                return {
+                    "category": category,
+                    "confidence": 0.98,  # High confidence for learned keywords
+                    "method": "learned_keyword",
+                    "needs_user_confirmation": False,
+                    "alternatives": [],
+                    "learned": True  # Flag to indicate this was learned
+                }
+
+        # Fall back to parent class static keywords
+        return super().match_keywords(text, text_lower=text_lower)
     
+    async def categorize_async(
+        self,
+        text: str,
+        user_id: Optional[str] = None,
+        threshold: float = 0.45,
+        embedding=None
+    ):
+        """
+        Async categorize for async endpoints.
+        Learned keywords are fetched with Motor; the CPU-bound model work
+        runs in a worker thread so the event loop stays free. Shares the
+        result cache with categorize().
+        """
+        text_lower = text.lower()
+        key = (text_lower, threshold)
+        if user_id:
+            # Warms the cache used by match_keywords below (before the
+            # result lookup, as in categorize())
+            await self._load_user_keywords_async(user_id)
+
+        results = self._user_results(user_id)
+        cached = results.get(key)
+        if cached is not None:
+            return cached
+
+        # Keyword hits are cheap; only the semantic path needs a thread
+        result = self.match_keywords(text, user_id, text_lower=text_lower)
+        if not result:
+            result = await asyncio.to_thread(
+                self.semantic_categorize, text, threshold, embedding
+            )
+
+        results.set(key, result)
+        return result
+
     def get_user_keywords(self, user_id: str) -> Dict[str, List[str]]:
         """Get all learned keywords for a user"""
         return self._load_user_keywords(user_id)
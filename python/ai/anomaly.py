@@ -1,13 +1,12 @@
 # python/ai/anomaly.py
 
-import pickle
 import numpy as np
+from ai.artifacts import load_artifact
 
 
 class BehaviorAnomalyDetector:
     def __init__(self):
-        with open("python/ai/behavior_anomaly_model.pkl", "rb") as f:
-            self.model = pickle.load(f)
+        self.model = load_artifact("behavior_anomaly_model.pkl")
 
     def detect(self, *, amount_norm, emotion_score, confidence):
         """
@@ -21,7 +20,8 @@ class BehaviorAnomalyDetector:
         ]])
 
         score = float(self.model.decision_function(features)[0])
-        is_anomaly = self.model.predict(features)[0] == -1
+        # IsolationForest.predict is just decision_function < 0
+        is_anomaly = score < 0
 
         return {
             "is_anomaly": is_anomaly,
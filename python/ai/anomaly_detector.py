@@ -13,8 +13,93 @@ All methods are fail-safe and backward compatible.
 
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import statistics
+from functools import lru_cache
 import math
+import threading
+import numpy as np
+from cachetools import TTLCache
+
+from ai.history_arrays import HistoryArrays
+from ai.numeric_kernels import group_stats, COUNT, TOTAL, N_POSITIVE, MEAN, M2
+
+
+# Day ordinal for history rows whose date cannot be parsed (never in a window)
+_NO_DAY = np.iinfo(np.int64).min
+
+
+@lru_cache(maxsize=4096)
+def _day_ordinal(value: str) -> int:
+    """Day ordinal of a YYYY-MM-DD string (memoized; history dates repeat a lot)"""
+    return datetime.fromisoformat(value).toordinal()
+
+
+def _ceil_ordinal(moment: datetime) -> int:
+    """Smallest day ordinal whose midnight is >= moment"""
+    ordinal = moment.toordinal()
+    if moment.time() != datetime.min.time():
+        ordinal += 1
+    return ordinal
+
+
+class RunningStats:
+    """
+    Running aggregates for one slice of history.
+    count/total cover every transaction; n/mean/m2 (Welford) cover positive amounts.
+    """
+
+    __slots__ = ("count", "total", "n", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def from_row(cls, row: np.ndarray) -> "RunningStats":
+        """Build from one row of numeric_kernels.group_stats output"""
+        stats = cls()
+        stats.count = int(row[COUNT])
+        stats.total = float(row[TOTAL])
+        stats.n = int(row[N_POSITIVE])
+        stats.mean = float(row[MEAN])
+        stats.m2 = float(row[M2])
+        return stats
+
+    def add(self, amount: float):
+        """Welford update with one new transaction amount"""
+        self.count += 1
+        self.total += amount
+        if amount > 0:
+            self.n += 1
+            delta = amount - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (amount - self.mean)
+
+    @property
+    def stdev(self) -> float:
+        """Sample standard deviation (ddof=1) of positive amounts"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+
+class UserStats:
+    """Pre-aggregated history statistics: overall + per category"""
+
+    __slots__ = ("size", "overall", "categories")
+
+    def __init__(self, size: int, overall: RunningStats, categories: Dict[str, RunningStats]):
+        self.size = size
+        self.overall = overall
+        self.categories = categories
+
+    def category(self, category: str) -> RunningStats:
+        return self.categories.get(category) or RunningStats()
+
+    def add(self, amount: float, category: str):
+        self.size += 1
+        self.overall.add(amount)
+        self.categories.setdefault(category, RunningStats()).add(amount)
 
 
 class BehaviorAnomalyDetector:
@@ -23,9 +108,34 @@ class BehaviorAnomalyDetector:
     No ML models required - uses robust statistical methods.
     """
 
+    __slots__ = ("user_stats_cache", "_stats_lock")
+
+    # Per-user stats cache: user_id -> (UserStats, revision), validated
+    # against the history's row count and newest _id (see _history_revision)
+    STATS_CACHE_MAXSIZE = 10_000
+    STATS_CACHE_TTL_SECONDS = 300
+
+    # Expected ratios by category (heuristics)
+    _EXPECTED_RATIOS = {
+        "food & dining": 0.15,
+        "food & groceries": 0.20,
+        "transportation": 0.10,
+        "entertainment": 0.05,
+        "healthcare": 0.05,
+        "housing": 0.30,
+        "utilities": 0.08,
+        "shopping": 0.10,
+        "technology": 0.05,
+        "other": 0.10
+    }
+    _DEFAULT_EXPECTED_RATIO = 0.10
+
     def __init__(self):
         """Initialize detector (no heavy models loaded)"""
-        pass
+        self.user_stats_cache = TTLCache(
+            maxsize=self.STATS_CACHE_MAXSIZE, ttl=self.STATS_CACHE_TTL_SECONDS
+        )
+        self._stats_lock = threading.Lock()
 
     def detect(
         self,
@@ -34,7 +144,9 @@ class BehaviorAnomalyDetector:
         category: str,
         date: str,
         user_history: List[Dict],
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        user_id: Optional[str] = None,
+        history_arrays: Optional[HistoryArrays] = None
     ) -> Dict:
         """
         Detect if a transaction is anomalous based on user's spending history.
@@ -45,6 +157,11 @@ class BehaviorAnomalyDetector:
             date: Transaction date (YYYY-MM-DD)
             user_history: List of past transactions (dicts with 'amount', 'category', 'date')
             user_profile: Optional user profile (income, family_size, etc.)
+            user_id: Optional user ID; enables reuse of pre-aggregated stats
+                across calls while the history's revision matches (rows need
+                their '_id'; see record_transaction)
+            history_arrays: Optional column view of user_history
+                (HistoryArrays.from_history), built here when not given
 
         Returns:
             {
@@ -70,15 +187,25 @@ class BehaviorAnomalyDetector:
             except:
                 tx_date = datetime.now()
 
+            # Read the history rows once; every check works on the columns
+            if history_arrays is None:
+                history_arrays = HistoryArrays.from_history(user_history)
+
+            # Aggregate history once, shared by the statistical checks
+            stats = self._get_user_stats(user_id, user_history, history_arrays)
+
             # Calculate anomaly scores
             amount_score, amount_reason = self._detect_amount_anomaly(
-                amount, category, user_history, user_profile
+                amount, category, user_history, user_profile, stats
             )
             category_score, category_reason = self._detect_category_anomaly(
-                amount, category, user_history
+                amount, category, user_history, stats, category.lower()
             )
+
             frequency_score, frequency_reason = self._detect_frequency_anomaly(
-                category, tx_date, user_history
+                category, tx_date, user_history,
+                self._history_day_ordinals(user_history, tx_date, history_arrays),
+                history_arrays
             )
 
             # Weighted combination
@@ -132,12 +259,100 @@ class BehaviorAnomalyDetector:
                 "severity": "low"
             }
 
+    def precompute_user_stats(
+        self, history: List[Dict], arrays: Optional[HistoryArrays] = None
+    ) -> UserStats:
+        """
+        Aggregate history into overall and per-category running stats.
+        """
+        if arrays is None:
+            arrays = HistoryArrays.from_history(history)
+        amts, cat_ids, names = arrays.amounts, arrays.category_ids, arrays.categories
+        per_category = group_stats(amts, cat_ids, len(names))
+        overall = group_stats(amts, np.zeros_like(cat_ids), 1)[0]
+        categories = {
+            name: RunningStats.from_row(row)
+            for name, row in zip(names, per_category)
+        }
+        return UserStats(len(history), RunningStats.from_row(overall), categories)
+
+    @staticmethod
+    def _history_revision(history: List[Dict]):
+        """Newest '_id' in the history, or None when rows carry no ids"""
+        return max((t["_id"] for t in history if t.get("_id") is not None), default=None)
+
+    def _get_user_stats(
+        self,
+        user_id: Optional[str],
+        history: List[Dict],
+        arrays: Optional[HistoryArrays] = None
+    ) -> UserStats:
+        """
+        Cached stats for a user, reused only while they cover exactly this
+        history: same row count and same newest _id. Histories without ids
+        are aggregated without caching.
+        """
+        revision = self._history_revision(history) if user_id else None
+        if revision is None:
+            return self.precompute_user_stats(history, arrays)
+
+        with self._stats_lock:
+            entry = self.user_stats_cache.get(user_id)
+        if entry is not None:
+            stats, cached_revision = entry
+            if cached_revision == revision and stats.size == len(history):
+                return stats
+
+        stats = self.precompute_user_stats(history, arrays)
+        with self._stats_lock:
+            self.user_stats_cache[user_id] = (stats, revision)
+        return stats
+
+    def record_transaction(self, user_id: str, transaction_id, amount: float, category: str):
+        """
+        Fold a transaction into the user's cached stats once it is stored,
+        so the next detect() (whose history includes it) skips the rebuild.
+        category must be the stored value; transaction_id its '_id'.
+        """
+        with self._stats_lock:
+            entry = self.user_stats_cache.get(user_id)
+            if entry is None:
+                return
+            stats, _ = entry
+            stats.add(amount, category)
+            self.user_stats_cache[user_id] = (stats, transaction_id)
+
+    def _history_day_ordinals(
+        self,
+        history: List[Dict],
+        default: datetime,
+        arrays: Optional[HistoryArrays] = None
+    ) -> np.ndarray:
+        """
+        int64 day ordinal of every history date (aligned with history).
+        Missing dates default to the transaction date; unparseable ones never
+        fall inside a window.
+        """
+        default_ordinal = default.toordinal()
+
+        def to_ordinal(value):
+            if value is None:
+                return default_ordinal
+            try:
+                return _day_ordinal(value)
+            except (TypeError, ValueError):
+                return _NO_DAY
+
+        dates = arrays.dates if arrays is not None else [t.get("date") for t in history]
+        return np.fromiter(map(to_ordinal, dates), dtype=np.int64, count=len(dates))
+
     def _detect_amount_anomaly(
         self,
         amount: float,
         category: str,
         history: List[Dict],
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        stats: Optional[UserStats] = None
     ) -> Tuple[float, str]:
         """
         Detect if amount is unusually high compared to historical average.
@@ -145,23 +360,23 @@ class BehaviorAnomalyDetector:
         Returns: (score 0.0-1.0, reason string)
         """
         try:
-            # Filter by category
-            category_txns = [t for t in history if t.get("category") == category]
-            
-            if len(category_txns) < 2:
+            if stats is None:
+                stats = self.precompute_user_stats(history)
+
+            sample = stats.category(category)
+
+            if sample.count < 2:
                 # Not enough data for this category
                 # Compare against all transactions
-                all_amounts = [t.get("amount", 0) for t in history if t.get("amount", 0) > 0]
-                if len(all_amounts) < 2:
+                sample = stats.overall
+                if sample.n < 2:
                     return 0.0, ""
-                
-                avg = statistics.mean(all_amounts)
-                std = statistics.stdev(all_amounts) if len(all_amounts) > 1 else avg * 0.3
-            else:
-                # Category-specific analysis
-                amounts = [t.get("amount", 0) for t in category_txns if t.get("amount", 0) > 0]
-                avg = statistics.mean(amounts)
-                std = statistics.stdev(amounts) if len(amounts) > 1 else avg * 0.3
+            elif sample.n == 0:
+                return 0.0, ""
+
+            # Category-specific analysis (or overall fallback)
+            avg = sample.mean
+            std = sample.stdev if sample.n > 1 else avg * 0.3
 
             # Z-score calculation
             if std == 0:
@@ -197,7 +412,9 @@ class BehaviorAnomalyDetector:
         self,
         amount: float,
         category: str,
-        history: List[Dict]
+        history: List[Dict],
+        stats: Optional[UserStats] = None,
+        category_lower: Optional[str] = None
     ) -> Tuple[float, str]:
         """
         Detect if category spending pattern is unusual.
@@ -208,12 +425,12 @@ class BehaviorAnomalyDetector:
             if len(history) < 5:
                 return 0.0, ""
 
+            if stats is None:
+                stats = self.precompute_user_stats(history)
+
             # Calculate category spending ratio
-            total_spending = sum(t.get("amount", 0) for t in history)
-            category_spending = sum(
-                t.get("amount", 0) for t in history 
-                if t.get("category") == category
-            )
+            total_spending = stats.overall.total
+            category_spending = stats.category(category).total
 
             if total_spending == 0:
                 return 0.0, ""
@@ -228,22 +445,9 @@ class BehaviorAnomalyDetector:
             # Check if this transaction significantly changes category ratio
             ratio_change = abs(new_ratio - category_ratio)
 
-            # Expected ratios by category (heuristics)
-            expected_ratios = {
-                "food & dining": 0.15,
-                "food & groceries": 0.20,
-                "transportation": 0.10,
-                "entertainment": 0.05,
-                "healthcare": 0.05,
-                "housing": 0.30,
-                "utilities": 0.08,
-                "shopping": 0.10,
-                "technology": 0.05,
-                "other": 0.10
-            }
-
-            category_lower = category.lower()
-            expected = expected_ratios.get(category_lower, 0.10)
+            if category_lower is None:
+                category_lower = category.lower()
+            expected = self._EXPECTED_RATIOS.get(category_lower, self._DEFAULT_EXPECTED_RATIO)
 
             # Score based on deviation from expected
             if new_ratio > expected * 1.5:
@@ -265,7 +469,9 @@ class BehaviorAnomalyDetector:
         self,
         category: str,
         date: datetime,
-        history: List[Dict]
+        history: List[Dict],
+        day_ordinals: Optional[np.ndarray] = None,
+        arrays: Optional[HistoryArrays] = None
     ) -> Tuple[float, str]:
         """
         Detect if transaction frequency is unusually high.
@@ -276,24 +482,26 @@ class BehaviorAnomalyDetector:
             if len(history) < 5:
                 return 0.0, ""
 
-            # Count transactions in same category in last 7 days
-            week_ago = date - timedelta(days=7)
-            recent_same_category = [
-                t for t in history
-                if t.get("category") == category and
-                datetime.strptime(t.get("date", date.strftime("%Y-%m-%d")), "%Y-%m-%d") >= week_ago
-            ]
-
-            # Count transactions in same category in previous 7 days (before week_ago)
-            two_weeks_ago = date - timedelta(days=14)
-            previous_same_category = [
-                t for t in history
-                if t.get("category") == category and
-                two_weeks_ago <= datetime.strptime(t.get("date", date.strftime("%Y-%m-%d")), "%Y-%m-%d") < week_ago
-            ]
-
-            recent_count = len(recent_same_category)
-            previous_count = len(previous_same_category)
+            if day_ordinals is None:
+                day_ordinals = self._history_day_ordinals(history, date)
+
+            if arrays is not None:
+                same_category = arrays.category_mask(category)
+            else:
+                same_category = np.fromiter(
+                    (t.get("category") == category for t in history),
+                    dtype=bool,
+                    count=len(history)
+                )
+
+            # Count transactions in same category in last 7 days, and in the
+            # previous 7 days (before week_ago)
+            week_ago = _ceil_ordinal(date - timedelta(days=7))
+            two_weeks_ago = _ceil_ordinal(date - timedelta(days=14))
+            recent_count = int(np.count_nonzero(same_category & (day_ordinals >= week_ago)))
+            previous_count = int(np.count_nonzero(
+                same_category & (day_ordinals >= two_weeks_ago) & (day_ordinals < week_ago)
+            ))
 
             if previous_count == 0:
                 # No baseline, check if recent count is high
@@ -0,0 +1,85 @@
+# python/ai/artifacts.py
+"""
+Loading of trained model artifacts (.pkl files) shipped next to this module.
+
+Loads are memoized by path so constructing several AI modules (or the same
+module twice) reads and unpickles each file only once per process.
+Centroids are stored as .npz (labels + float32 matrix, optionally with a
+precomputed int8 copy) so they load without running the pickle machinery.
+"""
+
+import os
+import pickle
+from functools import lru_cache
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@lru_cache(maxsize=None)
+def _load_pickle(path: str):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_artifact(filename: str):
+    """
+    Load a pickled artifact from the ai/ directory (cached).
+    The returned object is shared - treat it as read-only.
+    """
+    return _load_pickle(os.path.join(BASE_DIR, filename))
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """Cached arrays are shared by every consumer - forbid in-place edits"""
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=None)
+def _load_npz(path: str):
+    with np.load(path, allow_pickle=False) as z:
+        return (
+            [str(label) for label in z["labels"]],
+            _readonly(np.ascontiguousarray(z["matrix"], dtype=np.float32))
+        )
+
+
+def load_centroids(name: str):
+    """
+    Load centroids as (labels, (K, D) float32 matrix) (cached).
+
+    Prefers the pickle-free <name>.npz; falls back to the legacy <name>.pkl dict.
+    """
+    npz_path = os.path.join(BASE_DIR, f"{name}.npz")
+    if os.path.exists(npz_path):
+        return _load_npz(npz_path)
+
+    centroids = load_artifact(f"{name}.pkl")
+    labels = list(centroids)
+    matrix = np.stack([centroids[label] for label in labels]).astype(np.float32)
+    return labels, matrix
+
+
+@lru_cache(maxsize=None)
+def _load_npz_quantized(path: str):
+    with np.load(path, allow_pickle=False) as z:
+        if "matrix_q" not in z.files:
+            return None
+        return (
+            _readonly(np.ascontiguousarray(z["matrix_q"], dtype=np.int8)),
+            _readonly(np.ascontiguousarray(z["scales"], dtype=np.float32))
+        )
+
+
+def load_quantized_centroids(name: str):
+    """
+    Precomputed int8 centroids as (int8 (K, D) matrix, (K,) float32 scales),
+    quantized from the L2-normalized rows at training time (cached).
+    None if <name>.npz predates them.
+    """
+    npz_path = os.path.join(BASE_DIR, f"{name}.npz")
+    if not os.path.exists(npz_path):
+        return None
+    return _load_npz_quantized(npz_path)
@@ -1,20 +1,34 @@
 # python/ai/categorizer.py
 
-import pickle
-import os
-from sklearn.metrics.pairwise import cosine_similarity
-from ai.embeddings import EmbeddingModel
+import numpy as np
+from ai.artifacts import load_centroids, load_quantized_centroids
+from ai.embeddings import get_shared_embedder, normalize_rows, normalize_vector
+from ai.keyword_matcher import KeywordMatcher
+from ai.quantization import quantize_rows, int8_scores, widen_for_scoring
+from ai.result_cache import ResultCache, normalize_text
 
 
 class SemanticCategorizer:
     def __init__(self):
-        self.embedder = EmbeddingModel()
+        self.embedder = get_shared_embedder()
+        names, centroids = load_centroids("category_centroids")
+        self.category_centroids = dict(zip(names, centroids))
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(base_dir, "category_centroids.pkl")
+        # Keep centroids as one L2-normalized (K, D) matrix so scoring
+        # every category is a single matrix-vector product
+        self._cat_names = list(names)
+        self._cat_matrix = normalize_rows(centroids)
+        # int8 copy used for scoring (4x smaller; ranking is unaffected).
+        # Written by train_categorizer.py; older artifacts are quantized here.
+        quantized = load_quantized_centroids("category_centroids")
+        if quantized is None:
+            quantized = quantize_rows(self._cat_matrix)
+        matrix_q, self._cat_scales = quantized
+        # Widened once (float32, contiguous) so each score is one BLAS gemv
+        self._cat_matrix_q = widen_for_scoring(matrix_q)
 
-        with open(model_path, "rb") as f:
-            self.category_centroids = pickle.load(f)
+        # Semantic results depend only on the text, so repeats are memoized
+        self._semantic_cache = ResultCache()
 
         self.keyword_rules = {
             "dining": ["lunch", "dinner", "restaurant", "zomato", "swiggy"],
@@ -32,36 +46,72 @@ class SemanticCategorizer:
             "pet_supplies": ["pet", "dog", "cat"]
         }
 
+        # Single automaton over all keywords (one pass per text)
+        self._keyword_matcher = KeywordMatcher(self.keyword_rules)
+
     # -------------------------
-    def _keyword_match(self, text: str):
-        text = text.lower()
-        for category, keywords in self.keyword_rules.items():
-            for kw in keywords:
-                if kw in text:
-                    return {
-                        "category": category,
-                        "confidence": 0.95,
-                        "method": "keyword",
-                        "needs_user_confirmation": False,
-                        "alternatives": []
-                    }
+    def _keyword_match(self, text: str, text_lower: str = None):
+        if text_lower is None:
+            text_lower = text.lower()
+        category = self._keyword_matcher.match(text_lower)
+        if category:
+            return {
+                "category": category,
+                "confidence": 0.95,
+                "method": "keyword",
+                "needs_user_confirmation": False,
+                "alternatives": []
+            }
         return None
 
     # -------------------------
-    def categorize(self, text: str, threshold: float = 0.45):
+    def _score(self, embedding):
+        """Cosine similarity of the embedding against every centroid"""
+        return int8_scores(self._cat_matrix_q, self._cat_scales, normalize_vector(embedding))
+
+    # -------------------------
+    def match_keywords(self, text: str, user_id: str = None, *, text_lower: str = None):
+        """
+        Keyword-only categorization (no embedding). Returns None on a miss,
+        so callers know they still need the semantic path.
+        """
+        return self._keyword_match(text, text_lower)
+
+    # -------------------------
+    def categorize(self, text: str, threshold: float = 0.45, embedding=None, *, text_lower: str = None):
 
-        keyword_result = self._keyword_match(text)
+        keyword_result = self._keyword_match(text, text_lower)
         if keyword_result:
             return keyword_result
 
-        embedding = self.embedder.encode(text)
+        return self.semantic_categorize(text, threshold, embedding)
 
-        scores = {
-            category: cosine_similarity([embedding], [centroid])[0][0]
-            for category, centroid in self.category_centroids.items()
-        }
+    # -------------------------
+    def semantic_categorize(self, text: str, threshold: float = 0.45, embedding=None):
+        """
+        Centroid-similarity categorization (skips keyword rules)
+        """
+        key = (normalize_text(text), threshold)
+        cached = self._semantic_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._semantic_result(text, threshold, embedding)
+        self._semantic_cache.set(key, result)
+        return result
+
+    def _semantic_result(self, text: str, threshold: float, embedding=None):
+        # Reuse a pre-computed embedding when the caller already has one
+        if embedding is None:
+            embedding = self.embedder.encode(text)
+
+        scores = self._score(embedding)
 
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        # Only the top 3 categories are ever reported
+        k = min(3, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        sorted_scores = [(self._cat_names[i], scores[i]) for i in top]
         best_category, best_score = sorted_scores[0]
 
         if best_score < threshold:
@@ -1,14 +1,125 @@
 # python/ai/embeddings.py
 
+import os
+import threading
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
+from ai.onnx_embeddings import OnnxEncoder, onnx_model_available
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def _select_device() -> str:
+    """
+    Pick the inference device: EMBEDDING_DEVICE env override, else CUDA, MPS, CPU
+    """
+    override = os.getenv("EMBEDDING_DEVICE")
+    if override:
+        return override
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def _use_onnx() -> bool:
+    """
+    EMBEDDING_BACKEND: "onnx", "torch", or "auto" (ONNX if the int8 model was exported)
+    """
+    backend = os.getenv("EMBEDDING_BACKEND", "auto").lower()
+    if backend == "torch":
+        return False
+    if backend == "onnx":
+        return True
+    return _select_device() == "cpu" and onnx_model_available()
+
+
+def _load_model():
+    if _use_onnx():
+        return OnnxEncoder()
+
+    device = _select_device()
+    model = SentenceTransformer(MODEL_NAME, device=device)
+
+    if device.startswith("cuda"):
+        # FP16 halves memory traffic and uses tensor cores
+        model.half()
+    elif device == "cpu":
+        # Split cores between server workers instead of oversubscribing
+        workers = int(os.getenv("WEB_CONCURRENCY", "1") or 1)
+        if workers > 1:
+            torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+    return model
+
+
+def normalize_rows(matrix):
+    """
+    L2-normalize each row of a (K, D) matrix
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def normalize_vector(vector):
+    """
+    L2-normalize a single embedding vector (as float32)
+    """
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
 
 class EmbeddingModel:
+    """
+    Loads its own model; use get_shared_embedder() so MiniLM is only
+    loaded into memory once per process.
+    """
+
     def __init__(self):
-        # Load once (important for FastAPI performance)
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+        self.model = _load_model()
 
     def encode(self, text: str):
         """
         Convert text into embedding vector
         """
-        return self.model.encode([text])[0]
+        return self.encode_batch([text])[0]
+
+    def encode_batch(self, texts: list[str]):
+        """
+        Convert many texts into embeddings with a single forward pass.
+        Returns a (len(texts), dim) numpy array.
+        """
+        if isinstance(self.model, OnnxEncoder):
+            return self.model.encode(texts, batch_size=64)
+
+        with torch.inference_mode():
+            embeddings = self.model.encode(
+                texts,
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        # FP16 models return float16; downstream scoring expects float32
+        return embeddings.astype(np.float32, copy=False)
+
+
+_shared_embedder = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_embedder() -> EmbeddingModel:
+    """
+    Process-wide EmbeddingModel used by all AI modules (loaded once, even
+    when several modules initialize concurrently)
+    """
+    global _shared_embedder
+    if _shared_embedder is None:
+        with _shared_lock:
+            if _shared_embedder is None:
+                _shared_embedder = EmbeddingModel()
+    return _shared_embedder
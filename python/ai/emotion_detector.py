@@ -1,36 +1,56 @@
-import pickle
-from sklearn.metrics.pairwise import cosine_similarity
-from ai.embeddings import EmbeddingModel
-import os
+from ai.artifacts import load_artifact, load_centroids
+from ai.embeddings import get_shared_embedder, normalize_rows, normalize_vector
+from ai.linear_head import LinearHead
+from ai.quantization import quantize_rows, int8_scores, widen_for_scoring
+from ai.result_cache import ResultCache, normalize_text
 
 class EmotionDetector:
     def __init__(self):
-        self.embedder = EmbeddingModel()
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.join(base_dir, "emotion_classifier.pkl"), "rb") as f:
-            self.model = pickle.load(f)
+        self.embedder = get_shared_embedder()
+        self.model = load_artifact("emotion_classifier.pkl")
+        self._head = LinearHead(self.model)
+        self.label_encoder = load_artifact("emotion_label_encoder.pkl")
+        # Label for each probability column (classifier classes are encoded ids)
+        self._labels = [str(label) for label in self.label_encoder.classes_[self._head.classes]]
+        names, centroids = load_centroids("emotion_centroids")
+        self.centroids = dict(zip(names, centroids))
 
-        with open(os.path.join(base_dir, "emotion_label_encoder.pkl"), "rb") as f:
-            self.label_encoder = pickle.load(f)
+        # L2-normalized (K, D) centroid matrix for one-shot similarity scoring
+        self._emotion_names = list(names)
+        self._emotion_index = {e: i for i, e in enumerate(self._emotion_names)}
+        self._emotion_matrix = normalize_rows(centroids)
+        matrix_q, self._emotion_scales = quantize_rows(self._emotion_matrix)
+        self._emotion_matrix_q = widen_for_scoring(matrix_q)
+        self._cache = ResultCache()
 
-        with open(os.path.join(base_dir,"emotion_centroids.pkl"), "rb") as f:
-            self.centroids = pickle.load(f)
-
-    def predict(self, text: str):
+    def predict(self, text: str, embedding=None):
         """
         Predict emotion + emotion score
         """
-        embedding = self.embedder.encode(text)
+        key = normalize_text(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._predict(text, embedding)
+        self._cache.set(key, result)
+        return result
+
+    def _predict(self, text: str, embedding=None):
+        if embedding is None:
+            embedding = self.embedder.encode(text)
 
         # Emotion classification
-        probs = self.model.predict_proba([embedding])[0]
+        probs = self._head.predict_proba(embedding)
         idx = int(probs.argmax())
-        emotion = self.encoder.inverse_transform([idx])[0]
+        emotion = self._labels[idx]
 
         # Emotion score via centroid similarity
-        score = cosine_similarity(
-            [embedding], [self.centroids[emotion]]
-        )[0][0]
+        row = self._emotion_index[emotion]
+        score = int8_scores(
+            self._emotion_matrix_q[row:row + 1], self._emotion_scales[row:row + 1],
+            normalize_vector(embedding)
+        )[0]
 
         return {
             "emotion": emotion,
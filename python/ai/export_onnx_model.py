@@ -0,0 +1,43 @@
+import os
+import torch
+from transformers import AutoTokenizer, AutoModel
+from onnxruntime.quantization import quantize_dynamic, QuantType
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+OUTPUT_DIR = os.path.join(BASE_DIR, "minilm-onnx")
+FP32_PATH = os.path.join(OUTPUT_DIR, "model.onnx")
+INT8_PATH = os.path.join(OUTPUT_DIR, "model-int8.onnx")
+
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+print("Loading transformer...")
+tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+model = AutoModel.from_pretrained(MODEL_NAME).eval()
+
+print("Exporting to ONNX...")
+dummy = tokenizer(["paid 250 for lunch"], return_tensors="pt")
+dynamic = {0: "batch", 1: "sequence"}
+with torch.inference_mode():
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+        FP32_PATH,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": dynamic,
+            "attention_mask": dynamic,
+            "token_type_ids": dynamic,
+            "last_hidden_state": dynamic
+        },
+        opset_version=14
+    )
+
+print("Quantizing weights to int8...")
+quantize_dynamic(FP32_PATH, INT8_PATH, weight_type=QuantType.QInt8)
+
+tokenizer.save_pretrained(OUTPUT_DIR)
+
+print("✅ minilm-onnx/model-int8.onnx saved")
@@ -0,0 +1,48 @@
+# python/ai/history_arrays.py
+"""
+Column (struct-of-arrays) view of a transaction history.
+
+Built once per analysis and shared by the modules that accept it, so each
+row's dict fields are read a single time instead of once per module.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+
+@dataclass
+class HistoryArrays:
+    """
+    amounts / category_ids are aligned with the history rows; category_ids
+    index categories (distinct t.get("category") values in order of first
+    appearance). dates holds the raw date values (ISO strings or None).
+    """
+    amounts: np.ndarray         # float64, missing amounts as 0
+    category_ids: np.ndarray    # int64
+    categories: List
+    dates: List
+
+    @classmethod
+    def from_history(cls, history: List[Dict]) -> "HistoryArrays":
+        n = len(history)
+        amounts = np.empty(n, dtype=np.float64)
+        category_ids = np.empty(n, dtype=np.int64)
+        dates = [None] * n
+        index = {}
+        for i, t in enumerate(history):
+            amounts[i] = t.get("amount") or 0
+            category_ids[i] = index.setdefault(t.get("category"), len(index))
+            dates[i] = t.get("date")
+        return cls(amounts, category_ids, list(index), dates)
+
+    def __len__(self) -> int:
+        return self.amounts.shape[0]
+
+    def category_mask(self, category) -> np.ndarray:
+        """Boolean mask of the rows whose category equals category"""
+        try:
+            return self.category_ids == self.categories.index(category)
+        except ValueError:
+            return np.zeros(len(self), dtype=bool)
@@ -1,31 +1,40 @@
-import pickle
-import os
 import numpy as np
-from ai.embeddings import EmbeddingModel
+from ai.artifacts import load_artifact
+from ai.embeddings import get_shared_embedder
+from ai.linear_head import LinearHead
+from ai.result_cache import ResultCache, normalize_text
 
 
 class IntentClassifier:
     def __init__(self):
-        self.embedder = EmbeddingModel()
+        self.embedder = get_shared_embedder()
+        self.model = load_artifact("intent_classifier.pkl")
+        self._head = LinearHead(self.model)
+        self.label_encoder = load_artifact("intent_label_encoder.pkl")
+        # Label for each probability column (classifier classes are encoded ids)
+        self._intent_labels = [str(label) for label in self.label_encoder.classes_[self._head.classes]]
+        self._cache = ResultCache()
 
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(base_dir, "intent_classifier.pkl")
-        with open(model_path, "rb") as f:
-         self.model = pickle.load(f)
-
-        model_path1 = os.path.join(base_dir, "intent_label_encoder.pkl")
-        with open(model_path1, "rb") as f:
-            self.label_encoder = pickle.load(f)
-
-    def predict(self, text: str):
+    def predict(self, text: str, embedding=None):
         """
         Predict intent with confidence
         """
-        embedding = self.embedder.encode(text)
-        probs = self.model.predict_proba([embedding])[0]
+        key = normalize_text(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._predict(text, embedding)
+        self._cache.set(key, result)
+        return result
+
+    def _predict(self, text: str, embedding=None):
+        if embedding is None:
+            embedding = self.embedder.encode(text)
+        probs = self._head.predict_proba(embedding)
 
         idx = int(np.argmax(probs))
-        intent = self.label_encoder.inverse_transform([idx])[0]
+        intent = self._intent_labels[idx]
         confidence = float(probs[idx])
 
         return {
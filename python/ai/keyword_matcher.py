@@ -0,0 +1,55 @@
+# python/ai/keyword_matcher.py
+"""
+Multi-pattern keyword matching for the categorizers.
+
+Builds one Aho-Corasick automaton over every keyword so a text is scanned
+once regardless of how many keywords exist. Falls back to plain substring
+checks if ahocorasick-rs is not installed.
+"""
+
+from typing import Dict, List, Optional
+
+try:
+    import ahocorasick_rs
+except ImportError:  # optional dependency
+    ahocorasick_rs = None
+
+
+class KeywordMatcher:
+    """
+    Maps a (lowercased) text to the first category whose keyword it contains.
+    Category order of the rules dict is preserved: if keywords of several
+    categories match, the earliest category wins (same as a nested loop).
+    """
+
+    def __init__(self, rules: Dict[str, List[str]]):
+        self.patterns: List[str] = []
+        self.categories: List[str] = []
+
+        seen = set()
+        for category, keywords in rules.items():
+            for kw in keywords:
+                if kw and kw not in seen:
+                    seen.add(kw)
+                    self.patterns.append(kw)
+                    self.categories.append(category)
+
+        self._ac = None
+        if ahocorasick_rs is not None and self.patterns:
+            self._ac = ahocorasick_rs.AhoCorasick(self.patterns)
+
+    def match(self, text_lower: str) -> Optional[str]:
+        """Return the matched category for an already-lowercased text"""
+        if not self.patterns:
+            return None
+
+        if self._ac is not None:
+            hits = self._ac.find_matches_as_indexes(text_lower, overlapping=True)
+            if not hits:
+                return None
+            return self.categories[min(h[0] for h in hits)]
+
+        for kw, category in zip(self.patterns, self.categories):
+            if kw in text_lower:
+                return category
+        return None
@@ -0,0 +1,30 @@
+# python/ai/linear_head.py
+"""
+Inference-only wrapper around a fitted sklearn linear classifier.
+
+Caches coef_/intercept_/classes_ once so each prediction is a single
+matrix-vector product + softmax, skipping sklearn's per-call input validation.
+"""
+
+import numpy as np
+
+
+class LinearHead:
+    def __init__(self, model):
+        self.coef = np.asarray(model.coef_, dtype=np.float32)
+        self.intercept = np.asarray(model.intercept_, dtype=np.float32)
+        self.classes = np.asarray(model.classes_)
+
+    def predict_proba(self, embedding):
+        """
+        Class probabilities for one embedding (matches LogisticRegression.predict_proba)
+        """
+        logits = self.coef @ np.asarray(embedding, dtype=np.float32) + self.intercept
+
+        # Binary models expose a single decision value for the positive class
+        if logits.shape[0] == 1:
+            logits = np.array([0.0, logits[0]], dtype=np.float32)
+
+        logits = logits - logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
@@ -0,0 +1,224 @@
+# python/ai/numeric_kernels.py
+"""
+Numeric kernels shared by the statistical AI modules.
+
+Kernels are compiled with Numba when it is installed; otherwise an
+equivalent vectorized NumPy implementation is used.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # optional dependency
+    HAS_NUMBA = False
+
+# Column layout of group_stats() output
+COUNT, TOTAL, N_POSITIVE, MEAN, M2 = range(5)
+
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _group_stats_kernel(amounts, group_ids, n_groups):
+        out = np.zeros((n_groups, 5))
+        for i in range(amounts.shape[0]):
+            g = group_ids[i]
+            a = amounts[i]
+            out[g, 0] += 1.0
+            out[g, 1] += a
+            if a > 0:
+                # Welford update over positive amounts
+                n = out[g, 2] + 1.0
+                out[g, 2] = n
+                delta = a - out[g, 3]
+                out[g, 3] += delta / n
+                out[g, 4] += delta * (a - out[g, 3])
+        return out
+
+
+    @njit(cache=True)
+    def _window_category_sums_kernel(amounts, cat_ids, day_offsets, window_days, n_cats):
+        n = amounts.shape[0]
+        sums = np.zeros((2, n_cats))
+        first = np.full((2, n_cats), n)
+        for i in range(n):
+            off = day_offsets[i]
+            if off >= 0:
+                w = 0
+            elif off >= -window_days:
+                w = 1
+            else:
+                continue
+            c = cat_ids[i]
+            sums[w, c] += amounts[i]
+            if first[w, c] == n:
+                first[w, c] = i
+        return sums, first
+
+
+def _group_stats_numpy(amounts, group_ids, n_groups):
+    out = np.zeros((n_groups, 5))
+    out[:, COUNT] = np.bincount(group_ids, minlength=n_groups)
+    out[:, TOTAL] = np.bincount(group_ids, weights=amounts, minlength=n_groups)
+
+    positive = amounts > 0
+    pos_ids = group_ids[positive]
+    pos_amounts = amounts[positive]
+    n = np.bincount(pos_ids, minlength=n_groups).astype(np.float64)
+    sums = np.bincount(pos_ids, weights=pos_amounts, minlength=n_groups)
+    mean = np.divide(sums, n, out=np.zeros(n_groups), where=n > 0)
+
+    out[:, N_POSITIVE] = n
+    out[:, MEAN] = mean
+    out[:, M2] = np.bincount(
+        pos_ids, weights=(pos_amounts - mean[pos_ids]) ** 2, minlength=n_groups
+    )
+    return out
+
+
+def group_stats(amounts: np.ndarray, group_ids: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Per-group aggregates in one pass.
+
+    Returns a (n_groups, 5) float64 array with columns
+    COUNT, TOTAL (all amounts) and N_POSITIVE, MEAN, M2 (positive amounts only).
+    """
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+    group_ids = np.ascontiguousarray(group_ids, dtype=np.int64)
+    if HAS_NUMBA:
+        return _group_stats_kernel(amounts, group_ids, n_groups)
+    return _group_stats_numpy(amounts, group_ids, n_groups)
+
+
+def _window_category_sums_numpy(amounts, cat_ids, day_offsets, window_days, n_cats):
+    n = amounts.shape[0]
+    sums = np.zeros((2, n_cats))
+    first = np.full((2, n_cats), n, dtype=np.int64)
+    windows = (day_offsets >= 0, (day_offsets < 0) & (day_offsets >= -window_days))
+    for w, mask in enumerate(windows):
+        ids = cat_ids[mask]
+        sums[w] = np.bincount(ids, weights=amounts[mask], minlength=n_cats)
+        present, first_pos = np.unique(ids, return_index=True)
+        first[w, present] = np.flatnonzero(mask)[first_pos]
+    return sums, first
+
+
+def window_category_sums(
+    amounts: np.ndarray,
+    cat_ids: np.ndarray,
+    day_offsets: np.ndarray,
+    window_days: int,
+    n_cats: int
+):
+    """
+    Per-category totals for two adjacent day windows in one pass.
+
+    day_offsets are days relative to the start of the recent window:
+    window 0 is offset >= 0, window 1 is -window_days <= offset < 0.
+    Returns (sums, first): (2, n_cats) float64 totals and the index of each
+    category's first row in each window (len(amounts) if absent).
+    """
+    amounts = np.ascontiguousarray(amounts, dtype=np.float64)
+    cat_ids = np.ascontiguousarray(cat_ids, dtype=np.int64)
+    day_offsets = np.ascontiguousarray(day_offsets, dtype=np.int64)
+    if HAS_NUMBA:
+        return _window_category_sums_kernel(amounts, cat_ids, day_offsets, window_days, n_cats)
+    return _window_category_sums_numpy(amounts, cat_ids, day_offsets, window_days, n_cats)
+
+
+def _health_score_py(
+    savings_pct, total_expense, monthly_income, family_size,
+    anomaly_count, txn_count, category_sums
+):
+    score = 0
+
+    # Adjust expectations based on family size
+    # Single person: higher savings expected
+    # Family: more expenses expected, adjust thresholds
+    if family_size == 1:
+        s0, s1, s2, s3 = 30.0, 20.0, 10.0, 0.0
+        e0, e1, e2 = 50.0, 70.0, 90.0
+    elif family_size <= 3:
+        s0, s1, s2, s3 = 25.0, 15.0, 8.0, 0.0
+        e0, e1, e2 = 60.0, 80.0, 95.0
+    else:  # 4+ members
+        s0, s1, s2, s3 = 20.0, 10.0, 5.0, 0.0
+        e0, e1, e2 = 70.0, 85.0, 98.0
+
+    # 1. Savings Discipline (40 points)
+    if savings_pct >= s0:
+        score += 40
+    elif savings_pct >= s1:
+        score += 30
+    elif savings_pct >= s2:
+        score += 20
+    elif savings_pct >= s3:
+        score += 10
+    else:
+        # Negative savings - penalty
+        score += max(0, 10 + int(savings_pct))
+
+    # 2. Spending Discipline (30 points)
+    if monthly_income > 0:
+        expense_ratio = (total_expense / monthly_income) * 100
+        if expense_ratio <= e0:
+            score += 30
+        elif expense_ratio <= e1:
+            score += 20
+        elif expense_ratio <= e2:
+            score += 10
+        else:
+            # Spending exceeds income significantly
+            score += max(0, 10 - int((expense_ratio - 100) / 10))
+
+    # 3. Expense Consistency (15 points); anomaly_count < 0 means unknown
+    if anomaly_count >= 0:
+        if anomaly_count == 0:
+            score += 15
+        elif anomaly_count <= 2:
+            score += 10
+        elif anomaly_count <= 5:
+            score += 5
+
+    # 4. Category Balance (15 points)
+    n_cats = category_sums.shape[0]
+    if txn_count >= 5 and total_expense > 0 and n_cats > 0:
+        max_ratio = category_sums.max() / total_expense
+        # Reward diverse spending, penalize over-concentration
+        if n_cats >= 5 and max_ratio < 0.5:
+            score += 15
+        elif n_cats >= 3 and max_ratio < 0.7:
+            score += 10
+        elif n_cats >= 2:
+            score += 5
+
+    return min(max(0, score), 100)
+
+
+# Scalar branching only, so the same source compiles under Numba as-is
+_health_score_kernel = njit(cache=True)(_health_score_py) if HAS_NUMBA else _health_score_py
+
+
+def health_score(
+    savings_pct: float,
+    total_expense: float,
+    monthly_income: float,
+    family_size: int,
+    anomaly_count: int,
+    txn_count: int,
+    category_sums: np.ndarray
+) -> int:
+    """
+    Financial health score (0-100) from the dashboard's aggregates.
+    anomaly_count < 0 skips the consistency component (count unknown).
+    """
+    return int(_health_score_kernel(
+        np.float64(savings_pct),
+        np.float64(total_expense),
+        np.float64(monthly_income),
+        np.int64(family_size),
+        np.int64(anomaly_count),
+        np.int64(txn_count),
+        np.ascontiguousarray(category_sums, dtype=np.float64)
+    ))
@@ -0,0 +1,70 @@
+# python/ai/onnx_embeddings.py
+"""
+int8-quantized ONNX Runtime encoder for all-MiniLM-L6-v2.
+
+Produces the same mean-pooled, L2-normalized sentence embeddings as
+SentenceTransformer. Build the model once with export_onnx_model.py.
+"""
+
+import os
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_MODEL_DIR = os.path.join(BASE_DIR, "minilm-onnx")
+ONNX_MODEL_FILE = "model-int8.onnx"
+MAX_SEQ_LENGTH = 256
+
+
+def onnx_model_available(model_dir: str = ONNX_MODEL_DIR) -> bool:
+    """True if an exported model exists and onnxruntime is installed"""
+    if not os.path.exists(os.path.join(model_dir, ONNX_MODEL_FILE)):
+        return False
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class OnnxEncoder:
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, ONNX_MODEL_FILE),
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def encode(self, texts: list[str], batch_size: int = 64):
+        """
+        Encode texts into a (len(texts), dim) float32 array of unit vectors
+        """
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            tokens = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=MAX_SEQ_LENGTH,
+                return_tensors="np"
+            )
+            feeds = {
+                name: tokens[name].astype(np.int64)
+                for name in self.input_names
+                if name in tokens
+            }
+            hidden = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            batches.append((pooled / norms).astype(np.float32))
+
+        return np.vstack(batches)
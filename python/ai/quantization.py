@@ -0,0 +1,57 @@
+# python/ai/quantization.py
+"""
+Symmetric int8 quantization for centroid similarity scoring.
+
+Each centroid row (and the query embedding) gets its own float32 scale;
+dot products accumulate in int32 and are rescaled afterwards.
+"""
+
+import numpy as np
+
+
+def quantize_rows(matrix: np.ndarray):
+    """
+    Quantize a (K, D) float matrix to int8 with one scale per row.
+    Returns (int8 matrix, (K,) float32 scales).
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def quantize_vector(vector: np.ndarray):
+    """
+    Quantize a (D,) float vector to int8. Returns (int8 vector, float scale).
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.abs(vector).max()) / 127.0 or 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+# Up to this many dims every partial sum of int8 x int8 products stays
+# below 2**24, so float32 accumulation is exact in any summation order
+EXACT_FLOAT32_DIMS = 2 ** 24 // (127 * 127)
+
+
+def widen_for_scoring(quantized: np.ndarray) -> np.ndarray:
+    """
+    Contiguous copy of an int8 (K, D) matrix in the dtype int8_scores
+    multiplies in: float32 (BLAS gemv, exact) when D allows, else int32.
+    Done once at load time instead of on every call.
+    """
+    exact = quantized.shape[-1] <= EXACT_FLOAT32_DIMS
+    return np.ascontiguousarray(quantized, dtype=np.float32 if exact else np.int32)
+
+
+def int8_scores(quantized: np.ndarray, scales: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """
+    Approximate quantized @ vector with exact integer accumulation.
+    quantized is ideally pre-widened with widen_for_scoring().
+    """
+    if quantized.dtype == np.int8:
+        quantized = widen_for_scoring(quantized)
+    q_vec, vec_scale = quantize_vector(vector)
+    acc = quantized @ q_vec.astype(quantized.dtype)
+    return acc.astype(np.float32) * (scales * vec_scale)
@@ -0,0 +1,45 @@
+# python/ai/result_cache.py
+"""
+Bounded LRU memoization for model outputs keyed by normalized text.
+
+Transaction texts repeat heavily (same merchant, same wording), and the
+embedding-based results depend only on the text, so repeats can skip the
+tokenizer + transformer entirely.
+"""
+
+import copy
+import threading
+
+from cachetools import LRUCache, TTLCache
+
+
+def normalize_text(text: str) -> str:
+    """
+    Cache key for a text: strip, collapse whitespace, lowercase.
+    MiniLM's tokenizer is uncased, so this does not change the embedding.
+    """
+    return " ".join(text.split()).lower()
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = 50_000, ttl: float | None = None):
+        # ttl (seconds) additionally expires entries that are time-sensitive
+        if ttl is None:
+            self._cache = LRUCache(maxsize=maxsize)
+        else:
+            self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value (a private copy) or None"""
+        with self._lock:
+            value = self._cache.get(key)
+        return copy.deepcopy(value) if value is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = copy.deepcopy(value)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -19,6 +19,13 @@ DATE_PATTERNS = [
     r"(\d{2}/\d{2}/\d{4})"
 ]
 
+# Compiled once at import. Patterns are tried in list order and the first
+# one that matches anywhere wins, so earlier patterns take precedence over
+# matches that appear earlier in the text.
+AMOUNT_RES = [re.compile(p, re.I) for p in AMOUNT_PATTERNS]
+MERCHANT_RES = [re.compile(p, re.I) for p in MERCHANT_PATTERNS]
+DATE_RES = [re.compile(p) for p in DATE_PATTERNS]
+
 # ---------------- CORE PARSER ---------------- #
 
 def parse_sms(message: str) -> Dict:
@@ -70,8 +77,8 @@ def parse_sms(message: str) -> Dict:
 # ---------------- HELPERS ---------------- #
 
 def _extract_amount(text: str) -> Optional[float]:
-    for pattern in AMOUNT_PATTERNS:
-        match = re.search(pattern, text)
+    for pattern in AMOUNT_RES:
+        match = pattern.search(text)
         if match:
             try:
                 return float(match.group(1).replace(",", ""))
@@ -81,16 +88,16 @@ def _extract_amount(text: str) -> Optional[float]:
 
 
 def _extract_merchant(text: str) -> Optional[str]:
-    for pattern in MERCHANT_PATTERNS:
-        match = re.search(pattern, text)
+    for pattern in MERCHANT_RES:
+        match = pattern.search(text)
         if match:
             return match.group(1).strip().title()
     return None
 
 
 def _extract_date(text: str) -> Optional[str]:
-    for pattern in DATE_PATTERNS:
-        match = re.search(pattern, text)
+    for pattern in DATE_RES:
+        match = pattern.search(text)
         if match:
             try:
                 return datetime.strptime(
@@ -12,19 +12,245 @@ Generates contextual financial tips based on:
 All tips are actionable and personalized.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import statistics
+import sys
+
+import numpy as np
+
+from ai.numeric_kernels import window_category_sums
+from ai.result_cache import ResultCache
+
+
+# Shared by all TipsEngine instances (one pool per process, not per call)
+_EXECUTOR = ThreadPoolExecutor(max_workers=6, thread_name_prefix="tips")
+
+# Lowercased category groups (interned, so membership is a pointer compare)
+FOOD_CATEGORIES = frozenset(map(sys.intern, ["food & dining", "food & groceries"]))
+TRANSPORT_CATEGORIES = frozenset(map(sys.intern, ["transportation", "cab"]))
+LEISURE_CATEGORIES = frozenset(map(sys.intern, ["entertainment", "shopping"]))
+
+# Metro cities for city-tier tips (matched on the part before any comma)
+_METRO_CITIES = frozenset({
+    "mumbai", "delhi", "new delhi", "bangalore", "bengaluru",
+    "chennai", "kolkata", "hyderabad", "pune"
+})
+
+# Typical share of total spending per category (%)
+CATEGORY_THRESHOLDS = {
+    "food & dining": 15,
+    "food & groceries": 20,
+    "transportation": 10,
+    "entertainment": 5,
+    "shopping": 10
+}
+
+
+def _ceil_day(moment: datetime) -> np.datetime64:
+    """
+    First calendar day whose midnight is >= moment, so that
+    `day >= _ceil_day(m)` matches `datetime(day) >= m` exactly.
+    """
+    day = np.datetime64(moment.date(), "D")
+    if moment.time() != datetime.min.time():
+        day += 1
+    return day
+
+
+def history_windows(now: datetime):
+    """
+    Start days (datetime.date) of the recent (last 30 days) and previous
+    (30-60 days ago) windows. Transactions dated on or after recent_start
+    are recent; prev_start <= date < recent_start are previous.
+    """
+    recent_start = _ceil_day(now - timedelta(days=30))
+    prev_start = _ceil_day(now - timedelta(days=60))
+    return recent_start.astype(date), prev_start.astype(date)
+
+
+def _parse_days(raw_dates: List, today: np.datetime64) -> np.ndarray:
+    """
+    "%Y-%m-%d" strings -> datetime64[D] array in one vectorized parse.
+    Missing dates count as today; unparseable ones become NaT and
+    drop out of every window.
+    """
+    filled = [today if d is None else d for d in raw_dates]
+    try:
+        return np.array(filled, dtype="datetime64[D]")
+    except ValueError:
+        days = np.empty(len(filled), dtype="datetime64[D]")
+        for i, d in enumerate(filled):
+            try:
+                days[i] = np.datetime64(d, "D")
+            except ValueError:
+                days[i] = np.datetime64("NaT")
+        return days
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _history_days(history: List[Dict], today: np.datetime64) -> np.ndarray:
+    """
+    Transaction days as datetime64[D]. Documents carrying a precomputed
+    "_day" (date.toordinal()) skip date parsing entirely.
+    """
+    ordinals = [t.get("_day") for t in history]
+    if None not in ordinals:
+        return (np.array(ordinals, dtype=np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]")
+    return _parse_days([t.get("date") for t in history], today)
+
+
+def _category_sums(amounts: np.ndarray, codes: np.ndarray, names: List[str]) -> Dict[str, float]:
+    """
+    Per-category amount totals, in order of first appearance.
+    """
+    if codes.size == 0:
+        return {}
+    totals = np.bincount(codes, weights=amounts, minlength=len(names))
+    present, first = np.unique(codes, return_index=True)
+    return {
+        names[code]: float(totals[code])
+        for code in present[np.argsort(first, kind="stable")]
+    }
+
+
+def _window_totals(sums: np.ndarray, first: np.ndarray, names: List[str], n_rows: int) -> Dict[str, float]:
+    """
+    One window of window_category_sums() as {category: total},
+    in order of first appearance within the window.
+    """
+    present = np.flatnonzero(first < n_rows)
+    return {
+        names[code]: float(sums[code])
+        for code in present[np.argsort(first[present], kind="stable")]
+    }
+
+
+@dataclass
+class HistoryStats:
+    """
+    Aggregates over a transaction history, computed once per generate() call
+    and shared by every generator.
+    """
+    n_transactions: int
+    grand_total: float
+    per_category_total: Dict[str, float]    # keyed by lowercased category
+    per_category_count: Dict[str, int]      # keyed by lowercased category
+    category_lower: Dict[str, str]          # category -> interned lowercase
+    recent_total: float                     # last 30 days
+    prev_total: float                       # 30-60 days ago
+    recent_per_category: Dict[str, float]
+    prev_per_category: Dict[str, float]
+
+    @classmethod
+    def from_history(cls, history: List[Dict], now: Optional[datetime] = None) -> "HistoryStats":
+        now = now or datetime.now()
+        today = np.datetime64(now.date(), "D")
+        recent_start, prev_start = (np.datetime64(d, "D") for d in history_windows(now))
+
+        category_codes = {}
+        codes = np.fromiter(
+            (category_codes.setdefault(t.get("category", "other"), len(category_codes)) for t in history),
+            dtype=np.int64,
+            count=len(history)
+        )
+        names = list(category_codes)
+        amounts = np.fromiter(
+            (t.get("amount") or 0 for t in history),
+            dtype=np.float64,
+            count=len(history)
+        )
+        days = _history_days(history, today)
+
+        # Day offsets from the start of the recent window (NaT -> int64 min,
+        # which falls outside both windows)
+        day_offsets = (days - recent_start).astype(np.int64)
+        window_days = int((recent_start - prev_start).astype(np.int64))
+        recent_mask = day_offsets >= 0
+        prev_mask = (day_offsets < 0) & (day_offsets >= -window_days)
+        window_sums, window_first = window_category_sums(
+            amounts, codes, day_offsets, window_days, len(names)
+        )
+
+        # Lowercase each distinct category once, not once per transaction
+        category_lower = {name: sys.intern(str(name).lower()) for name in names}
+        counts = np.bincount(codes, minlength=len(names))
+        per_category_total = {}
+        per_category_count = {}
+        for name, total in _category_sums(amounts, codes, names).items():
+            key = category_lower[name]
+            per_category_total[key] = per_category_total.get(key, 0.0) + total
+            per_category_count[key] = per_category_count.get(key, 0) + int(counts[category_codes[name]])
+
+        return cls(
+            n_transactions=len(history),
+            grand_total=float(amounts.sum()),
+            per_category_total=per_category_total,
+            per_category_count=per_category_count,
+            category_lower=category_lower,
+            recent_total=float(amounts[recent_mask].sum()),
+            prev_total=float(amounts[prev_mask].sum()),
+            recent_per_category=_window_totals(window_sums[0], window_first[0], names, len(history)),
+            prev_per_category=_window_totals(window_sums[1], window_first[1], names, len(history))
+        )
+
+    @classmethod
+    def from_aggregates(
+        cls,
+        n_transactions: int,
+        grand_total: float,
+        categories: List[tuple],
+        recent: List[tuple],
+        prev: List[tuple]
+    ) -> "HistoryStats":
+        """
+        Build from pre-aggregated totals (e.g. a MongoDB $group) instead of
+        the raw history. categories holds (category, total, count) over the
+        whole history; recent / prev hold (category, total) for the two
+        history_windows(). Each list is in order of first appearance.
+        """
+        category_lower = {name: sys.intern(str(name).lower()) for name, _, _ in categories}
+        per_category_total = {}
+        per_category_count = {}
+        for name, total, count in categories:
+            key = category_lower[name]
+            per_category_total[key] = per_category_total.get(key, 0.0) + float(total)
+            per_category_count[key] = per_category_count.get(key, 0) + int(count)
+
+        recent_per_category = {name: float(total) for name, total in recent}
+        prev_per_category = {name: float(total) for name, total in prev}
+        return cls(
+            n_transactions=int(n_transactions),
+            grand_total=float(grand_total),
+            per_category_total=per_category_total,
+            per_category_count=per_category_count,
+            category_lower=category_lower,
+            recent_total=float(sum(recent_per_category.values())),
+            prev_total=float(sum(prev_per_category.values())),
+            recent_per_category=recent_per_category,
+            prev_per_category=prev_per_category
+        )
 
 
 class TipsEngine:
     """
     Production-grade tips generation engine.
-    No external dependencies beyond standard library.
+    History columns are handled as NumPy arrays; otherwise standard library only.
     """
 
+    TIPS_CACHE_MAXSIZE = 5000
+    TIPS_CACHE_TTL_SECONDS = 300
+
     def __init__(self):
-        pass
+        # Tips for the same user, history and inputs on the same day, for up
+        # to 5 minutes (page reloads / UI polling)
+        self._tips_cache = ResultCache(
+            maxsize=self.TIPS_CACHE_MAXSIZE, ttl=self.TIPS_CACHE_TTL_SECONDS
+        )
 
     def generate(
         self,
@@ -35,7 +261,9 @@ class TipsEngine:
         category: Optional[str] = None,
         amount: Optional[float] = None,
         monthly_expense: Optional[float] = None,
-        monthly_income: Optional[float] = None
+        monthly_income: Optional[float] = None,
+        user_id: Optional[str] = None,
+        history_stats: Optional[HistoryStats] = None
     ) -> List[Dict]:
         """
         Generate personalized financial tips.
@@ -48,6 +276,9 @@ class TipsEngine:
             amount: Current transaction amount (if analyzing specific transaction)
             monthly_expense: Total monthly expenses
             monthly_income: Monthly income
+            user_id: Enables memoization of the result for up to 5 minutes
+            history_stats: Pre-aggregated history (HistoryStats.from_aggregates),
+                used in place of transaction_history
 
         Returns:
             List of tip dicts:
@@ -58,51 +289,131 @@ class TipsEngine:
             }
         """
         tips = []
+        now = datetime.now()
+
+        cache_key = None
+        if user_id is not None:
+            try:
+                cache_key = self._cache_key(
+                    user_id, now, user_profile, transaction_history, history_stats,
+                    anomaly_result, category, amount, monthly_expense, monthly_income
+                )
+            except Exception:
+                # Fail-safe: unkeyable inputs (e.g. odd profile values) skip the cache
+                cache_key = None
+            if cache_key is not None:
+                cached = self._tips_cache.get(cache_key)
+                if cached is not None:
+                    return cached
 
         try:
             # Calculate monthly income if not provided
             if not monthly_income and user_profile.get("annual_income"):
                 monthly_income = user_profile["annual_income"] / 12
 
+            # Aggregate the history once for all generators
+            stats = history_stats
+            if transaction_history:
+                stats = HistoryStats.from_history(transaction_history, now)
+            if stats is not None and not stats.n_transactions:
+                stats = None
+
+            generators = []
+
             # 1. Anomaly-based tips
             if anomaly_result and anomaly_result.get("is_anomaly"):
-                tips.extend(self._generate_anomaly_tips(anomaly_result, category, amount))
+                generators.append((self._generate_anomaly_tips, (anomaly_result, category, amount)))
 
             # 2. Spending pattern tips
-            if transaction_history and len(transaction_history) >= 5:
-                tips.extend(self._generate_pattern_tips(
-                    transaction_history, user_profile, monthly_income
-                ))
+            if stats and stats.n_transactions >= 5:
+                generators.append((self._generate_pattern_tips, (stats, user_profile, monthly_income)))
 
             # 3. Category-specific tips
-            if category and transaction_history:
-                tips.extend(self._generate_category_tips(
-                    category, transaction_history, user_profile, monthly_income
+            if category and stats:
+                generators.append((
+                    self._generate_category_tips,
+                    (category, stats, user_profile, monthly_income)
                 ))
 
             # 4. Income-to-expense ratio tips
             if monthly_income and monthly_expense:
-                tips.extend(self._generate_ratio_tips(
-                    monthly_income, monthly_expense, user_profile
+                generators.append((
+                    self._generate_ratio_tips,
+                    (monthly_income, monthly_expense, user_profile)
                 ))
 
             # 5. Profile-based lifestyle tips
-            tips.extend(self._generate_lifestyle_tips(user_profile, transaction_history))
+            generators.append((self._generate_lifestyle_tips, (user_profile, stats)))
 
             # 6. Anomaly-based detailed tips (if anomalies exist)
-            if transaction_history:
-                tips.extend(self._generate_anomaly_detailed_tips(
-                    transaction_history, user_profile, monthly_income
+            if stats:
+                generators.append((
+                    self._generate_anomaly_detailed_tips,
+                    (stats, user_profile, monthly_income)
                 ))
 
+            # Generators are independent reads of the same stats; run them
+            # concurrently but collect in submission order so output is stable
+            futures = [_EXECUTOR.submit(fn, *args) for fn, args in generators]
+            for future in futures:
+                tips.extend(future.result() or [])
+
             # Remove duplicates and limit to top 8 for detailed display
-            unique_tips = self._deduplicate_tips(tips)
-            return unique_tips[:8]
+            unique_tips = self._deduplicate_tips(tips)[:8]
+
+            if cache_key is not None:
+                self._tips_cache.set(cache_key, unique_tips)
+            return unique_tips
 
         except Exception as e:
-            # Fail-safe: Return empty list on error
+            # Fail-safe: Return empty list on error (not cached)
             return []
 
+    def _cache_key(
+        self,
+        user_id: str,
+        now: datetime,
+        user_profile: Dict,
+        history: Optional[List[Dict]],
+        history_stats: Optional[HistoryStats],
+        anomaly_result: Optional[Dict],
+        *inputs
+    ):
+        """
+        Memoization key: user, day (the 30/60-day windows move daily), a
+        cheap history revision (length + last transaction, or the aggregate
+        totals) and every other input. None when an input is unhashable,
+        which disables caching.
+        """
+        if history or history_stats is None:
+            last = history[-1] if history else {}
+            history_key = (
+                len(history or ()),
+                last.get("_id"),
+                last.get("date"),
+                last.get("amount")
+            )
+        else:
+            history_key = (
+                history_stats.n_transactions,
+                history_stats.grand_total,
+                history_stats.recent_total,
+                history_stats.prev_total
+            )
+        key = (
+            user_id,
+            now.date(),
+            history_key,
+            tuple(sorted(user_profile.items())),
+            tuple(sorted(anomaly_result.items())) if anomaly_result else None,
+            inputs
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
     def _generate_anomaly_tips(
         self,
         anomaly_result: Dict,
@@ -131,7 +442,7 @@ class TipsEngine:
 
     def _generate_pattern_tips(
         self,
-        history: List[Dict],
+        stats: HistoryStats,
         profile: Dict,
         monthly_income: Optional[float]
     ) -> List[Dict]:
@@ -140,23 +451,10 @@ class TipsEngine:
 
         try:
             # Calculate monthly spending
-            now = datetime.now()
-            month_ago = now - timedelta(days=30)
-            
-            recent_txns = [
-                t for t in history
-                if datetime.strptime(t.get("date", now.strftime("%Y-%m-%d")), "%Y-%m-%d") >= month_ago
-            ]
-            
-            current_month_spend = sum(t.get("amount", 0) for t in recent_txns)
+            current_month_spend = stats.recent_total
 
             # Previous month comparison
-            two_months_ago = now - timedelta(days=60)
-            previous_txns = [
-                t for t in history
-                if two_months_ago <= datetime.strptime(t.get("date", now.strftime("%Y-%m-%d")), "%Y-%m-%d") < month_ago
-            ]
-            previous_month_spend = sum(t.get("amount", 0) for t in previous_txns)
+            previous_month_spend = stats.prev_total
 
             if previous_month_spend > 0:
                 change_pct = ((current_month_spend - previous_month_spend) / previous_month_spend) * 100
@@ -199,7 +497,7 @@ class TipsEngine:
     def _generate_category_tips(
         self,
         category: str,
-        history: List[Dict],
+        stats: HistoryStats,
         profile: Dict,
         monthly_income: Optional[float]
     ) -> List[Dict]:
@@ -208,9 +506,9 @@ class TipsEngine:
 
         try:
             # Calculate category spending
-            category_txns = [t for t in history if t.get("category", "").lower() == category.lower()]
-            category_total = sum(t.get("amount", 0) for t in category_txns)
-            total_spending = sum(t.get("amount", 0) for t in history)
+            category_lower = category.lower()
+            category_total = stats.per_category_total.get(category_lower, 0.0)
+            total_spending = stats.grand_total
 
             if total_spending == 0:
                 return tips
@@ -218,15 +516,7 @@ class TipsEngine:
             category_ratio = (category_total / total_spending) * 100
 
             # Category-specific thresholds
-            category_thresholds = {
-                "food & dining": 15,
-                "food & groceries": 20,
-                "transportation": 10,
-                "entertainment": 5,
-                "shopping": 10
-            }
-
-            threshold = category_thresholds.get(category.lower(), 10)
+            threshold = CATEGORY_THRESHOLDS.get(category_lower, 10)
 
             if category_ratio > threshold * 1.5:
                 tips.append({
@@ -239,7 +529,7 @@ class TipsEngine:
             if monthly_income:
                 category_to_income = (category_total / monthly_income) * 100
                 
-                if category_to_income > 35 and category.lower() in ["food & dining", "food & groceries"]:
+                if category_to_income > 35 and category_lower in FOOD_CATEGORIES:
                     tips.append({
                         "message": f"💰 {category} is {category_to_income:.0f}% of your monthly income. Meal planning could help reduce costs.",
                         "severity": "medium",
@@ -309,7 +599,7 @@ class TipsEngine:
     def _generate_lifestyle_tips(
         self,
         profile: Dict,
-        history: Optional[List[Dict]]
+        stats: Optional[HistoryStats]
     ) -> List[Dict]:
         """Generate lifestyle and profile-based tips."""
         tips = []
@@ -317,12 +607,14 @@ class TipsEngine:
         try:
             family_size = profile.get("family_members", 1)
             has_pets = profile.get("has_pets", False)
-            city = profile.get("city", "").lower()
+            city_key = profile.get("city", "").split(",")[0].strip().lower()
 
             # Family size tips
-            if family_size >= 4 and history:
-                grocery_txns = [t for t in history if "grocery" in t.get("category", "").lower()]
-                if len(grocery_txns) < 10:
+            if family_size >= 4 and stats:
+                grocery_count = sum(
+                    count for cat, count in stats.per_category_count.items() if "grocery" in cat
+                )
+                if grocery_count < 10:
                     tips.append({
                         "message": "👨‍👩‍👧‍👦 For a family of 4+, consider bulk buying and monthly grocery planning to optimize costs.",
                         "severity": "low",
@@ -331,8 +623,10 @@ class TipsEngine:
 
             # Pet-related tips
             if has_pets:
-                pet_txns = [t for t in (history or []) if "pet" in t.get("category", "").lower()]
-                if len(pet_txns) > 0:
+                has_pet_txns = stats is not None and any(
+                    "pet" in cat for cat in stats.per_category_count
+                )
+                if has_pet_txns:
                     tips.append({
                         "message": "🐾 Pet expenses detected. Consider subscription plans for pet supplies to save on recurring costs.",
                         "severity": "low",
@@ -340,7 +634,7 @@ class TipsEngine:
                     })
 
             # City tier tips (if available)
-            if "mumbai" in city or "delhi" in city or "bangalore" in city:
+            if city_key in _METRO_CITIES:
                 tips.append({
                     "message": "🏙️ Living in a metro city? Transportation and dining costs can be high. Use public transport and meal prep when possible.",
                     "severity": "low",
@@ -354,7 +648,7 @@ class TipsEngine:
 
     def _generate_anomaly_detailed_tips(
         self,
-        history: List[Dict],
+        stats: HistoryStats,
         profile: Dict,
         monthly_income: Optional[float]
     ) -> List[Dict]:
@@ -365,22 +659,8 @@ class TipsEngine:
             family_size = profile.get("family_size", 1)
             
             # Analyze spending trends for anomalies
-            now = datetime.now()
-            month_ago = now - timedelta(days=30)
-            two_months_ago = now - timedelta(days=60)
-            
-            recent_txns = [
-                t for t in history
-                if datetime.strptime(t.get("date", now.strftime("%Y-%m-%d")), "%Y-%m-%d") >= month_ago
-            ]
-            
-            previous_txns = [
-                t for t in history
-                if two_months_ago <= datetime.strptime(t.get("date", now.strftime("%Y-%m-%d")), "%Y-%m-%d") < month_ago
-            ]
-            
-            recent_total = sum(t.get("amount", 0) for t in recent_txns)
-            previous_total = sum(t.get("amount", 0) for t in previous_txns)
+            recent_total = stats.recent_total
+            previous_total = stats.prev_total
             
             if previous_total > 0:
                 change_pct = ((recent_total - previous_total) / previous_total) * 100
@@ -401,16 +681,8 @@ class TipsEngine:
                         })
                 
                 # Category-specific anomaly detection
-                recent_categories = {}
-                previous_categories = {}
-                
-                for t in recent_txns:
-                    cat = t.get("category", "other")
-                    recent_categories[cat] = recent_categories.get(cat, 0) + t.get("amount", 0)
-                
-                for t in previous_txns:
-                    cat = t.get("category", "other")
-                    previous_categories[cat] = previous_categories.get(cat, 0) + t.get("amount", 0)
+                recent_categories = stats.recent_per_category
+                previous_categories = stats.prev_per_category
                 
                 # Find categories with significant increases
                 for cat, recent_amt in recent_categories.items():
@@ -419,20 +691,21 @@ class TipsEngine:
                         cat_change = ((recent_amt - prev_amt) / prev_amt) * 100
                         
                         if cat_change > 50:  # More than 50% increase
+                            cat_lower = stats.category_lower[cat]
                             # Family-aware category tips
-                            if cat.lower() in ["food & groceries", "food & dining"] and family_size >= 3:
+                            if cat_lower in FOOD_CATEGORIES and family_size >= 3:
                                 tips.append({
                                     "message": f"🍽️ {cat} expenses increased by {cat_change:.0f}% this month. For a family of {family_size}, meal planning and bulk buying can significantly reduce costs. Consider: 1) Creating a weekly meal plan, 2) Shopping at wholesale stores, 3) Cooking at home more often, 4) Buying seasonal produce. This could save {int(recent_amt * 0.15)}-{int(recent_amt * 0.25)} per month.",
                                     "severity": "medium",
                                     "category": "advice"
                                 })
-                            elif cat.lower() in ["transportation", "cab"]:
+                            elif cat_lower in TRANSPORT_CATEGORIES:
                                 tips.append({
                                     "message": f"🚗 {cat} expenses jumped by {cat_change:.0f}% this month. Consider: 1) Using public transport for regular commutes, 2) Carpooling with colleagues, 3) Walking/cycling for short distances, 4) Planning errands in batches to reduce trips. Small changes can lead to big savings.",
                                     "severity": "medium",
                                     "category": "advice"
                                 })
-                            elif cat.lower() in ["entertainment", "shopping"]:
+                            elif cat_lower in LEISURE_CATEGORIES:
                                 tips.append({
                                     "message": f"🎮 {cat} spending increased by {cat_change:.0f}% this month. While entertainment is important, especially for families, consider setting a monthly budget limit. Look for free or low-cost alternatives like community events, library activities, or family game nights at home.",
                                     "severity": "medium",
@@ -451,14 +724,19 @@ class TipsEngine:
         return tips
 
     def _deduplicate_tips(self, tips: List[Dict]) -> List[Dict]:
-        """Remove duplicate tips based on message similarity."""
+        """
+        Remove duplicate tips. Keyed on the whole message (plus category and
+        severity) so tips sharing a template prefix are not collapsed; a
+        missing field keys as None rather than failing the whole list.
+        """
         seen = set()
         unique = []
         
         for tip in tips:
-            msg_key = tip["message"][:50]  # First 50 chars as key
-            if msg_key not in seen:
-                seen.add(msg_key)
-                unique.append(tip)
+            key = (tip.get("category"), tip.get("severity"), tip.get("message"))
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(tip)
         
         return unique
@@ -1,53 +1,57 @@
 import os
 import pandas as pd
 import pickle
-from sentence_transformers import SentenceTransformer
-from collections import defaultdict
 import numpy as np
 
+from _embed_cache import get_embeddings
+from quantization import quantize_rows
+
 # ---------------- PATH SAFE CONFIG ---------------- #
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 DATASET_PATH = os.path.join(BASE_DIR, "expense_nlp_master_2500_v2.csv")
 OUTPUT_PATH = os.path.join(BASE_DIR, "category_centroids.pkl")
+NPZ_OUTPUT_PATH = os.path.join(BASE_DIR, "category_centroids.npz")
 
 TEXT_COL = "text_clean"
 CATEGORY_COL = "category"
 
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-
-# ---------------- LOAD DATA ---------------- #
+# ---------------- LOAD DATA & EMBEDDINGS ---------------- #
 
 print("Loading dataset...")
-df = pd.read_csv(DATASET_PATH)
-
-# ---------------- LOAD MODEL ---------------- #
-
-print("Loading embedding model...")
-model = SentenceTransformer(MODEL_NAME)
-
-# ---------------- ENCODE & BUILD CENTROIDS ---------------- #
-
-category_embeddings = defaultdict(list)
+embeddings, df = get_embeddings(DATASET_PATH, TEXT_COL, [CATEGORY_COL])
 
-print("Encoding texts...")
-for _, row in df.iterrows():
-    text = str(row[TEXT_COL])
-    category = row[CATEGORY_COL]
-    emb = model.encode(text)
-    category_embeddings[category].append(emb)
+# ---------------- BUILD CENTROIDS ---------------- #
 
 print("Computing centroids...")
-category_centroids = {
-    cat: np.mean(vectors, axis=0)
-    for cat, vectors in category_embeddings.items()
-}
+# Bucket-sum rows per category in one pass (codes in first-appearance order)
+cat_ids, cats = pd.factorize(df[CATEGORY_COL])
+sums = np.zeros((len(cats), embeddings.shape[1]), dtype=np.float64)
+np.add.at(sums, cat_ids, embeddings)
+counts = np.bincount(cat_ids, minlength=len(cats))
+centroids = (sums / counts[:, None]).astype(np.float32)
+category_centroids = dict(zip(cats, centroids))
 
 # ---------------- SAVE ---------------- #
 
 with open(OUTPUT_PATH, "wb") as f:
-    pickle.dump(category_centroids, f)
+    pickle.dump(category_centroids, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+# Pickle-free copy loaded at inference time: labels, float32 matrix and
+# an int8 copy of the L2-normalized rows (one scale per row) for scoring
+labels = list(category_centroids)
+matrix = np.stack([category_centroids[c] for c in labels]).astype(np.float32)
+normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+matrix_q, scales = quantize_rows(normalized)
+np.savez(
+    NPZ_OUTPUT_PATH,
+    labels=np.array(labels),
+    matrix=matrix,
+    matrix_q=matrix_q,
+    scales=scales
+)
 
 print("✅ category_centroids.pkl saved successfully")
+print("✅ category_centroids.npz saved successfully")
 print(f"Categories trained: {list(category_centroids.keys())}")
@@ -1,10 +1,11 @@
 import os
 import pickle
-import pandas as pd
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import LabelEncoder
 
+from _embed_cache import get_embeddings
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 DATASET_PATH = os.path.join(BASE_DIR, "expense_nlp_master_2500_v2.csv")
@@ -15,27 +16,25 @@ TEXT_COL = "text_clean"
 INTENT_COL = "intent"
 
 print("Loading dataset...")
-df = pd.read_csv(DATASET_PATH)
+X, df = get_embeddings(DATASET_PATH, TEXT_COL, [INTENT_COL])
 
 print("Encoding intent labels...")
 label_encoder = LabelEncoder()
 y = label_encoder.fit_transform(df[INTENT_COL])
 
-print("Loading embedding model...")
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-
-print("Encoding texts...")
-X = model.encode(df[TEXT_COL].astype(str).tolist())
-
 print("Training intent classifier...")
 clf = LogisticRegression(max_iter=1000)
 clf.fit(X, y)
 
+# Inference runs in float32 (ai/linear_head.py); store the weights that way
+clf.coef_ = clf.coef_.astype(np.float32)
+clf.intercept_ = clf.intercept_.astype(np.float32)
+
 with open(MODEL_PATH, "wb") as f:
-    pickle.dump(clf, f)
+    pickle.dump(clf, f, protocol=pickle.HIGHEST_PROTOCOL)
 
 with open(ENCODER_PATH, "wb") as f:
-    pickle.dump(label_encoder, f)
+    pickle.dump(label_encoder, f, protocol=pickle.HIGHEST_PROTOCOL)
 
 print("✅ intent_classifier.pkl saved")
 print("✅ intent_label_encoder.pkl saved")
@@ -0,0 +1,92 @@
+# backend/auth_dep.py
+
+from fastapi import HTTPException, Header
+from bson import ObjectId
+from cachetools import TTLCache
+import threading
+import time
+import jwt
+
+from .config import JWT_ALGO, JWT_SECRET_BYTES
+from .database import async_users_col
+
+# ---------------- CONFIG ---------------- #
+JWT_ALGORITHMS = [JWT_ALGO]
+# Tokens must carry both claims (create_token always sets them)
+JWT_DECODE_OPTIONS = {"require": ["exp", "user_id"], "verify_signature": True}
+
+# ---------------- TOKEN CACHE ---------------- #
+# raw bearer token -> (user document, exp timestamp). Only successful
+# validations are stored; an entry is used until 5s before the token's own
+# exp, and never longer than TOKEN_CACHE_TTL so profile edits show up.
+# The cache is per worker process: forget_user() only clears the worker
+# that served the edit, so other workers may serve the old user document
+# for up to TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_MAXSIZE = 10_000
+TOKEN_CACHE_TTL = 60
+EXPIRY_MARGIN = 5
+
+# Only the fields routes read from the user; never the password hash
+USER_PROJECTION = {"name": 1, "email": 1, "annual_income": 1}
+
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=TOKEN_CACHE_TTL)
+# user _id -> time of the last forget_user(); lookups that started before
+# it may have read the pre-write document and are not cached
+_forgotten_users = TTLCache(maxsize=TOKEN_CACHE_MAXSIZE, ttl=TOKEN_CACHE_TTL)
+_token_lock = threading.Lock()
+
+
+def _cached_user(token: str):
+    with _token_lock:
+        entry = _token_cache.get(token)
+        if entry is None:
+            return None
+        user, exp = entry
+        if time.time() >= exp - EXPIRY_MARGIN:
+            _token_cache.pop(token, None)
+            return None
+    return dict(user)
+
+
+def forget_user(user_id) -> None:
+    """Drop cached tokens of a user whose document changed"""
+    with _token_lock:
+        _forgotten_users[user_id] = time.monotonic()
+        stale = [t for t, (user, _) in _token_cache.items() if user["_id"] == user_id]
+        for token in stale:
+            _token_cache.pop(token, None)
+
+
+# ---------------- AUTH DEPENDENCY ---------------- #
+async def get_current_user(authorization: str = Header(...)):
+    token = None
+    try:
+        scheme, token = authorization.split()
+        if scheme.lower() != "bearer":
+            raise Exception("Invalid auth scheme")
+
+        user = _cached_user(token)
+        if user is not None:
+            return user
+
+        payload = jwt.decode(
+            token, JWT_SECRET_BYTES, algorithms=JWT_ALGORITHMS, options=JWT_DECODE_OPTIONS
+        )
+        read_started = time.monotonic()
+        user = await async_users_col.find_one(
+            {"_id": ObjectId(payload["user_id"])}, USER_PROJECTION
+        )
+
+        if not user:
+            raise Exception("User not found")
+
+        with _token_lock:
+            forgotten_at = _forgotten_users.get(user["_id"])
+            if forgotten_at is None or read_started > forgotten_at:
+                _token_cache[token] = (user, float(payload["exp"]))
+        return dict(user)
+    except Exception:
+        if token is not None:
+            with _token_lock:
+                _token_cache.pop(token, None)
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
@@ -0,0 +1,35 @@
+# backend/config.py
+
+from dotenv import load_dotenv
+import os
+
+# --------------------------------------------------
+# Load environment variables (once, for the whole backend)
+# --------------------------------------------------
+
+# This file is inside backend/, so load backend/.env
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_PATH = os.path.join(BASE_DIR, ".env")
+
+load_dotenv(ENV_PATH)
+
+# --------------------------------------------------
+# Settings
+# --------------------------------------------------
+
+MONGO_URI = os.getenv("MONGO_URI")
+DB_NAME = os.getenv("DB_NAME", "smart_expense_analyzer")
+
+if not MONGO_URI:
+    raise RuntimeError("❌ MONGO_URI not found in backend/.env")
+
+JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_ALGO = os.getenv("JWT_ALGO", "HS256")
+
+if not JWT_SECRET:
+    raise RuntimeError("JWT_SECRET not set in environment")
+
+# Encoded once; PyJWT would otherwise encode the str key on every call
+JWT_SECRET_BYTES = JWT_SECRET.encode()
+
+DEBUG = os.getenv("DEBUG", "False").lower() == "true"
@@ -1,46 +1,141 @@
 # backend/database.py
 
-from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import PyMongoError
+from motor.motor_asyncio import AsyncIOMotorClient
+import functools
+import logging
+
+from .config import DB_NAME, MONGO_URI
 
 # --------------------------------------------------
-# Load environment variables
+# MongoDB Clients (lazy, one per worker process)
 # --------------------------------------------------
+# Clients are created on first use rather than at import, so each uvicorn
+# worker opens its own pool after it starts (see the startup hook in main.py).
 
-# This file is inside backend/, so load backend/.env
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ENV_PATH = os.path.join(BASE_DIR, ".env")
+@functools.cache
+def get_client() -> MongoClient:
+    return MongoClient(
+        MONGO_URI,
+        maxPoolSize=50,
+        minPoolSize=5,
+        connectTimeoutMS=3000
+    )
 
-load_dotenv(ENV_PATH)
 
-# --------------------------------------------------
-# MongoDB Configuration
-# --------------------------------------------------
+@functools.cache
+def get_async_client() -> AsyncIOMotorClient:
+    # Async client (Motor) for code paths running on the event loop
+    return AsyncIOMotorClient(
+        MONGO_URI,
+        maxPoolSize=50,
+        minPoolSize=5,
+        connectTimeoutMS=3000
+    )
 
-MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = os.getenv("DB_NAME", "smart_expense_analyzer")
 
-if not MONGO_URI:
-    raise RuntimeError("❌ MONGO_URI not found in backend/.env")
+def get_db():
+    return get_client()[DB_NAME]
 
-# --------------------------------------------------
-# MongoDB Client (singleton)
-# --------------------------------------------------
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+def get_async_db():
+    return get_async_client()[DB_NAME]
+
+
+class _LazyCollection:
+    """
+    Module-level collection handle that resolves its client on first use,
+    so `from backend.database import users_col` does not connect.
+    """
+
+    __slots__ = ("_name", "_get_db", "_collection")
+
+    def __init__(self, name: str, get_db):
+        self._name = name
+        self._get_db = get_db
+        self._collection = None
+
+    def _resolve(self):
+        if self._collection is None:
+            self._collection = self._get_db()[self._name]
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __getitem__(self, key):
+        return self._resolve()[key]
+
+    def __repr__(self):
+        return f"_LazyCollection({self._name!r})"
+
+
+def __getattr__(name):
+    # Backward-compatible module attributes for the clients / databases
+    lazy = {
+        "client": get_client,
+        "db": get_db,
+        "async_client": get_async_client,
+        "async_db": get_async_db
+    }
+    if name in lazy:
+        return lazy[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # --------------------------------------------------
 # Collections
 # --------------------------------------------------
 
-users_col = db["users"]
-profiles_col = db["profiles"]
-transactions_col = db["transactions"]
-alerts_col = db["alerts"]
-ai_feedback_col = db["ai_feedback"]
+users_col = _LazyCollection("users", get_db)
+profiles_col = _LazyCollection("profiles", get_db)
+transactions_col = _LazyCollection("transactions", get_db)
+anomalies_col = _LazyCollection("anomalies", get_db)
+alerts_col = _LazyCollection("alerts", get_db)
+ai_feedback_col = _LazyCollection("ai_feedback", get_db)
+
+# Motor counterparts for async route handlers
+async_users_col = _LazyCollection("users", get_async_db)
+async_profiles_col = _LazyCollection("profiles", get_async_db)
+async_transactions_col = _LazyCollection("transactions", get_async_db)
+async_anomalies_col = _LazyCollection("anomalies", get_async_db)
+async_alerts_col = _LazyCollection("alerts", get_async_db)
+async_ai_feedback_col = _LazyCollection("ai_feedback", get_async_db)
+
+# Profile fields the routes feed into the AI context (user_profile dicts)
+PROFILE_PROJECTION = {"annual_income": 1, "family_members": 1, "city": 1, "has_pets": 1}
 
 # 🔥 NEW: User-defined category learning
 # Stores custom categories taught by users
-user_categories_col = db["user_categories"]
+user_categories_col = _LazyCollection("user_categories", get_db)
+async_user_categories_col = _LazyCollection("user_categories", get_async_db)
+
+
+# --------------------------------------------------
+# Indexes
+# --------------------------------------------------
+# Every route filters by user_id and most sort by date / created_at.
+# Built from the startup hook in main.py (create_index is a no-op when the
+# index already exists).
+
+INDEXES = [
+    (transactions_col, [("user_id", ASCENDING), ("date", DESCENDING)], {}),
+    (anomalies_col, [("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    (alerts_col, [("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    (ai_feedback_col, [("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    (profiles_col, [("user_id", ASCENDING)], {"unique": True}),
+    (users_col, [("email", ASCENDING)], {"unique": True}),
+    (user_categories_col, [("user_id", ASCENDING), ("category", ASCENDING)], {"unique": True}),
+]
+
+
+def ensure_indexes():
+    """Create the query indexes; a failing one (e.g. duplicate emails) is logged and skipped"""
+    for collection, keys, options in INDEXES:
+        try:
+            collection.create_index(keys, **options)
+        except PyMongoError as e:
+            logging.getLogger(__name__).warning(
+                "Could not create index %s on %r: %s", keys, collection, e
+            )
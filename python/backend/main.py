@@ -2,11 +2,15 @@
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import logging
+import orjson
 import os
+import queue
 import sys
-import traceback
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
@@ -19,8 +23,69 @@ from backend.routes.transactions import transactions_router
 from backend.routes.dashboard import dashboard_router
 from backend.routes.analytics import analytics_router
 from backend.routes.feedback import feedback_router
+from backend.config import DEBUG
+from backend.database import ensure_indexes, get_client
+from backend.services.ai_service import get_ai_service
 
-app = FastAPI(title="Smart Expense Analyzer API")
+# Request handlers only enqueue log records; a listener thread does the
+# formatting and stderr I/O
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("api")
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue,
+    *(logging.getLogger().handlers or [logging.StreamHandler()]),
+    respect_handler_level=True
+)
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False
+
+
+class APIResponse(ORJSONResponse):
+    """
+    orjson-encoded responses; numpy scalars/arrays from the AI modules and
+    non-string dict keys serialize like they did with the stdlib encoder
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+
+
+def connect_database():
+    """Open this worker's MongoDB pool (after fork, not at import) and build indexes"""
+    try:
+        get_client().admin.command("ping")
+    except Exception as e:
+        logger.warning("MongoDB ping failed at startup: %s", e)
+        return
+    ensure_indexes()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker startup / shutdown. Nothing heavy runs at import, so the
+    reloader's parent process and module imports stay cheap.
+    """
+    _log_listener.start()
+    try:
+        # Load embedding model and artifacts once per worker, before serving;
+        # routes get the instance through services.ai_service.get_ai
+        app.state.ai_service = get_ai_service()
+        connect_database()
+        yield
+    finally:
+        _log_listener.stop()
+
+
+app = FastAPI(
+    title="Smart Expense Analyzer API",
+    default_response_class=APIResponse,
+    lifespan=lifespan
+)
 
 # CORS Middleware - MUST be added before routers
 # Note: When allow_credentials=True, cannot use "*" for origins
@@ -44,13 +109,15 @@ app.add_middleware(
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Ensure CORS headers are sent even on errors"""
-    print(f"Error occurred: {str(exc)}")
-    print(traceback.format_exc())
-    return JSONResponse(
+    if DEBUG:
+        logger.exception("Unhandled error on %s %s", request.method, request.url.path)
+    else:
+        logger.error("Unhandled error on %s %s: %s", request.method, request.url.path, exc)
+    return APIResponse(
         status_code=500,
         content={
             "detail": "Internal server error",
-            "error": str(exc) if os.getenv("DEBUG", "False").lower() == "true" else "An error occurred"
+            "error": str(exc) if DEBUG else "An error occurred"
         },
         headers={
             "Access-Control-Allow-Origin": request.headers.get("origin", "*"),
@@ -61,7 +128,7 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors with CORS headers"""
-    return JSONResponse(
+    return APIResponse(
         status_code=422,
         content={"detail": exc.errors()},
         headers={
@@ -89,8 +156,3 @@ def root():
 @app.get("/api/health")
 def health_check():
     return {"status": "healthy"}
-
-@app.options("/{full_path:path}")
-async def options_handler(full_path: str):
-    """Handle OPTIONS requests for CORS preflight"""
-    return {"message": "OK"}
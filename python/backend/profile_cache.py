@@ -0,0 +1,85 @@
+# backend/profile_cache.py
+
+from cachetools import TTLCache
+import asyncio
+import time
+
+from .database import PROFILE_PROJECTION, async_profiles_col
+
+# ---------------- PROFILE CACHE ---------------- #
+# user_id -> (profile context fields or None, fetched_at). Profiles change
+# rarely, so routes read them from here: entries older than
+# PROFILE_REFRESH_AFTER are still served, but refreshed in the background
+# (stale-while-revalidate); PUT /profile drops the entry.
+# The cache is per worker process: PUT /profile only clears the worker that
+# served it, so other workers may serve the old profile for up to
+# PROFILE_CACHE_TTL seconds.
+# Only touched from the event loop, so no lock is needed.
+PROFILE_CACHE_MAXSIZE = 10_000
+PROFILE_CACHE_TTL = 60
+PROFILE_REFRESH_AFTER = PROFILE_CACHE_TTL / 2
+
+_profile_cache = TTLCache(maxsize=PROFILE_CACHE_MAXSIZE, ttl=PROFILE_CACHE_TTL)
+_refreshing = {}   # user_id -> in-flight refresh task
+# user_id -> time of the last forget_profile(); reads that started before
+# it may have seen the pre-write document and are not stored
+_forgotten = TTLCache(maxsize=PROFILE_CACHE_MAXSIZE, ttl=PROFILE_CACHE_TTL)
+
+
+def cached_profile(user_id: str):
+    """
+    (hit, profile) from the cache without querying MongoDB; profile is None
+    for users without a profile document. Schedules a refresh when stale.
+    """
+    entry = _profile_cache.get(user_id)
+    if entry is None:
+        return False, None
+
+    profile, fetched_at = entry
+    if time.monotonic() - fetched_at > PROFILE_REFRESH_AFTER and user_id not in _refreshing:
+        task = asyncio.get_running_loop().create_task(_refresh(user_id))
+        _refreshing[user_id] = task
+        task.add_done_callback(lambda _: _refreshing.pop(user_id, None))
+    return True, dict(profile) if profile else None
+
+
+def remember_profile(user_id: str, profile, read_started: float) -> None:
+    """
+    Cache a profile read from MongoDB. read_started is time.monotonic()
+    taken before the read was issued; reads older than the user's last
+    forget_profile() are dropped.
+    """
+    forgotten_at = _forgotten.get(user_id)
+    if forgotten_at is not None and read_started <= forgotten_at:
+        return
+    _profile_cache[user_id] = (dict(profile) if profile else None, read_started)
+
+
+def forget_profile(user_id: str) -> None:
+    """Drop a user's entry (and any in-flight refresh) after a profile write"""
+    _forgotten[user_id] = time.monotonic()
+    _profile_cache.pop(user_id, None)
+    task = _refreshing.pop(user_id, None)
+    if task is not None:
+        task.cancel()
+
+
+async def _refresh(user_id: str):
+    read_started = time.monotonic()
+    try:
+        profile = await async_profiles_col.find_one({"user_id": user_id}, PROFILE_PROJECTION)
+    except Exception:
+        return  # keep serving the cached value until it expires
+    remember_profile(user_id, profile, read_started)
+
+
+async def get_profile(user_id: str):
+    """Profile context fields (PROFILE_PROJECTION) for a user, or None"""
+    hit, profile = cached_profile(user_id)
+    if hit:
+        return profile
+
+    read_started = time.monotonic()
+    profile = await async_profiles_col.find_one({"user_id": user_id}, PROFILE_PROJECTION)
+    remember_profile(user_id, profile, read_started)
+    return profile
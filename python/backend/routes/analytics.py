@@ -1,48 +1,57 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi import APIRouter, Query, Depends
 from datetime import datetime, timedelta
-from bson import ObjectId
-import jwt
-from collections import defaultdict
-import os
-from dotenv import load_dotenv
-
-from ..database import users_col, transactions_col
+import asyncio
+
+from ..auth_dep import get_current_user
+from ..database import async_transactions_col
+from ..profile_cache import get_profile
+from ..services.history_facets import (
+    category_facet,
+    stats_from_facets,
+    total_facet,
+    windows_facet
+)
 from ai.tips_engine import TipsEngine
 
 # ---------------- CONFIG ---------------- #
 
-load_dotenv()
-
-JWT_SECRET = os.getenv("JWT_SECRET")
-JWT_ALGO = os.getenv("JWT_ALGO", "HS256")
-
-if not JWT_SECRET:
-    raise RuntimeError("JWT_SECRET not set in environment")
-
 analytics_router = APIRouter()
 tips_engine = TipsEngine()   # ✅ singleton
 
-# ---------------- AUTH ---------------- #
-
-def get_current_user(authorization: str = Header(...)):
-    try:
-        scheme, token = authorization.split()
-
-        if scheme.lower() != "bearer":
-            raise Exception("Invalid auth scheme")
-
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
-        user = users_col.find_one({"_id": ObjectId(payload["user_id"])})
+# ---------------- HELPERS ---------------- #
 
-        if not user:
-            raise Exception("User not found")
+async def _aggregate_one(collection, pipeline):
+    """Run a single-$facet pipeline and return its one result document"""
+    result = await collection.aggregate(pipeline).to_list(1)
+    return result[0]
 
-        return user
 
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+def _analytics_facets(match: dict, now: datetime):
+    """
+    Per-category, per-source and per-day totals plus the overall total
+    for the matched transactions, and the tips engine's window totals,
+    in one round trip
+    """
+    return [
+        {"$match": match},
+        {"$facet": {
+            "by_category": category_facet() + [{"$sort": {"amount": -1}}],
+            "by_source": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$source", "manual"]},
+                    "amount": {"$sum": "$amount"}
+                }},
+                {"$sort": {"amount": -1}}
+            ],
+            "by_date": [
+                {"$group": {"_id": "$date", "amount": {"$sum": "$amount"}}},
+                {"$sort": {"_id": 1}}
+            ],
+            "total": total_facet(),
+            "windows": windows_facet(now)
+        }}
+    ]
 
-# ---------------- HELPERS ---------------- #
 
 def get_date_range(period: str):
     now = datetime.utcnow()
@@ -57,7 +66,7 @@ def get_date_range(period: str):
 # ---------------- ROUTE ---------------- #
 
 @analytics_router.get("/")
-def analytics(
+async def analytics(
     period: str = Query("monthly", enum=["weekly", "monthly", "yearly"]),
     user=Depends(get_current_user)
 ):
@@ -69,52 +78,42 @@ def analytics(
     - AI summary (lightweight)
     """
 
+    user_id = str(user["_id"])
     start_date = get_date_range(period).strftime("%Y-%m-%d")
+    match = {"user_id": user_id, "date": {"$gte": start_date}}
 
-    txns = list(transactions_col.find({
-        "user_id": str(user["_id"]),
-        "date": {"$gte": start_date}
-    }))
+    # Category / source / day totals and the tips engine's history stats
+    # are summed server-side; no transaction rows are transferred
+    facets, profile = await asyncio.gather(
+        _aggregate_one(async_transactions_col, _analytics_facets(match, datetime.now())),
+        get_profile(user_id)
+    )
 
-    if not txns:
+    if not facets["total"]:
         return {
             "message": "No transactions found for this period",
             "data": {}
         }
 
     # ---------------- CATEGORY ANALYSIS ---------------- #
-    category_totals = defaultdict(float)
-    for t in txns:
-        category_totals[t.get("category", "other")] += t.get("amount", 0)
-
     category_analysis = [
-        {"category": k, "amount": round(v, 2)}
-        for k, v in category_totals.items()
+        {"category": c["_id"], "amount": round(c["amount"], 2)}
+        for c in facets["by_category"]
     ]
 
     # ---------------- SOURCE ANALYSIS ---------------- #
-    source_totals = defaultdict(float)
-    for t in txns:
-        source_totals[t.get("source", "manual")] += t.get("amount", 0)
-
     source_analysis = [
-        {"source": k, "amount": round(v, 2)}
-        for k, v in source_totals.items()
+        {"source": c["_id"], "amount": round(c["amount"], 2)}
+        for c in facets["by_source"]
     ]
 
     # ---------------- TIME TREND ---------------- #
-    time_trend = defaultdict(float)
-    for t in txns:
-        time_trend[t["date"]] += t.get("amount", 0)
-
     time_trend_data = [
-        {"date": k, "amount": round(v, 2)}
-        for k, v in sorted(time_trend.items())
+        {"date": c["_id"], "amount": round(c["amount"], 2)}
+        for c in facets["by_date"]
     ]
 
     # ---------------- USER PROFILE ---------------- #
-    from ..database import profiles_col
-    profile = profiles_col.find_one({"user_id": str(user["_id"])})
     if not profile:
         profile = {}
         if user.get("annual_income"):
@@ -130,14 +129,18 @@ def analytics(
     
     # Calculate monthly values
     monthly_income = user_profile["annual_income"] / 12 if user_profile["annual_income"] else 0
-    total_spending = sum(category_totals.values())
+    totals = facets["total"][0]
+    total_spending = totals["amount"]
 
     # ---------------- AI SUMMARY (ENHANCED) ---------------- #
-    ai_summary = tips_engine.generate(
+    # CPU-bound; keep it off the event loop
+    ai_summary = await asyncio.to_thread(
+        tips_engine.generate,
         user_profile=user_profile,
-        transaction_history=txns,
+        history_stats=stats_from_facets(totals, facets["by_category"], facets["windows"]),
         monthly_expense=total_spending,
-        monthly_income=monthly_income
+        monthly_income=monthly_income,
+        user_id=user_id
     )
 
     return {
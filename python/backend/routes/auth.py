@@ -2,24 +2,12 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 import hashlib
+import hmac
 import jwt
-import os
-from dotenv import load_dotenv
+from bson import Binary
 
-from ..database import users_col, profiles_col
-
-
-# Load .env correctly
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ENV_PATH = os.path.join(os.path.dirname(BASE_DIR), ".env")
-load_dotenv(ENV_PATH)
-
-
-JWT_SECRET = os.getenv("JWT_SECRET")
-JWT_ALGO = os.getenv("JWT_ALGO", "HS256")
-
-if not JWT_SECRET:
-    raise RuntimeError("JWT_SECRET missing in .env")
+from ..config import JWT_ALGO, JWT_SECRET_BYTES
+from ..database import async_users_col, async_profiles_col
 
 auth_router = APIRouter()
 
@@ -39,8 +27,20 @@ class LoginRequest(BaseModel):
 
 # ------------------ HELPERS ------------------
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+def hash_password(password: str) -> bytes:
+    """Raw SHA-256 digest (stored as BSON Binary)"""
+    return hashlib.sha256(password.encode()).digest()
+
+
+def verify_password(password: str, stored) -> bool:
+    """
+    Constant-time check against a stored hash: raw digest bytes, or the
+    legacy hex string written by older signups.
+    """
+    digest = hash_password(password)
+    if isinstance(stored, str):
+        return hmac.compare_digest(stored, digest.hex())
+    return hmac.compare_digest(bytes(stored), digest)
 
 
 def create_token(user_id: str):
@@ -48,28 +48,28 @@ def create_token(user_id: str):
         "user_id": user_id,
         "exp": datetime.utcnow() + timedelta(days=7)
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGO)
+    return jwt.encode(payload, JWT_SECRET_BYTES, algorithm=JWT_ALGO)
 
 
 # ------------------ ROUTES ------------------
 
 @auth_router.post("/signup")
-def signup(data: SignupRequest):
+async def signup(data: SignupRequest):
     try:
-        if users_col.find_one({"email": data.email}):
+        if await async_users_col.find_one({"email": data.email}, {"_id": 1}):
             raise HTTPException(status_code=400, detail="User already exists")
 
         user = {
             "name": data.name,
             "email": data.email,
-            "password": hash_password(data.password),
+            "password": Binary(hash_password(data.password)),
             "annual_income": data.annual_income,
             "created_at": datetime.utcnow()
         }
 
-        result = users_col.insert_one(user)
+        result = await async_users_col.insert_one(user)
 
-        profiles_col.insert_one({
+        await async_profiles_col.insert_one({
             "user_id": str(result.inserted_id),
             "annual_income": data.annual_income,
             "updated_at": datetime.utcnow()
@@ -82,15 +82,25 @@ def signup(data: SignupRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @auth_router.post("/login")
-def login(data: LoginRequest):
-    user = users_col.find_one({"email": data.email})
+async def login(data: LoginRequest):
+    user = await async_users_col.find_one(
+        {"email": data.email},
+        {"password": 1, "name": 1, "email": 1, "annual_income": 1}
+    )
 
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    if user["password"] != hash_password(data.password):
+    if not verify_password(data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Upgrade legacy hex hashes to the binary form on successful login
+    if isinstance(user["password"], str):
+        await async_users_col.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"password": Binary(hash_password(data.password))}}
+        )
+
     token = create_token(str(user["_id"]))
 
     return {
@@ -1,45 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timedelta
-from bson import ObjectId
-import jwt
-import os
-from dotenv import load_dotenv
-
-from ..database import users_col, transactions_col, alerts_col, profiles_col
+from operator import itemgetter
+import asyncio
+import heapq
+
+from ..auth_dep import get_current_user
+from ..database import (
+    async_transactions_col,
+    async_anomalies_col,
+    async_alerts_col
+)
+from ..profile_cache import get_profile
+from ..services.history_facets import (
+    category_facet,
+    stats_from_facets,
+    total_facet,
+    windows_facet
+)
+from ai.numeric_kernels import health_score
 from ai.tips_engine import TipsEngine
 
 # ---------------- CONFIG ---------------- #
-load_dotenv()
-
-JWT_SECRET = os.getenv("JWT_SECRET")
-JWT_ALGO = os.getenv("JWT_ALGO", "HS256")
-
-if not JWT_SECRET:
-    raise RuntimeError("JWT_SECRET not set in environment")
-
 dashboard_router = APIRouter()
 tips_engine = TipsEngine()   # ✅ singleton
 
-# ---------------- AUTH ---------------- #
-def get_current_user(authorization: str = Header(...)):
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise Exception("Invalid auth scheme")
-
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
-        user = users_col.find_one({"_id": ObjectId(payload["user_id"])})
-
-        if not user:
-            raise Exception("User not found")
-
-        return user
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
 # ---------------- ROUTES ---------------- #
 @dashboard_router.get("/")
-def dashboard(user=Depends(get_current_user)):
+async def dashboard(user=Depends(get_current_user)):
     """
     Dashboard overview – lightweight & fast with anomalies and enhanced tips
     """
@@ -48,12 +35,32 @@ def dashboard(user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Authentication error: {str(e)}")
 
+    # ---------------- QUERIES (CONCURRENT) ---------------- #
+    # Totals, category / window sums and "latest N" lists are computed
+    # server-side in one $facet per collection; they feed the health score
+    # and the tips engine, so no raw history is transferred.
+    now = datetime.now()
+    (
+        profile,
+        txn_facets,
+        anomaly_facets,
+        recent_alerts
+    ) = await asyncio.gather(
+        get_profile(user_id),
+        _aggregate_one(async_transactions_col, _transaction_facets(user_id, now)),
+        _aggregate_one(async_anomalies_col, _anomaly_facets(user_id, now)),
+        async_alerts_col.find(
+            {"user_id": user_id}, {"type": 1, "message": 1, "_id": 0}
+        ).sort("created_at", -1).limit(3).to_list(None)
+    )
+    recent_transactions = txn_facets["recent"]
+    recent_anomalies_count = _facet_count(anomaly_facets, "count_last_30d")
+
     # ---------------- INCOME ---------------- #
     annual_income = user.get("annual_income", 0)
     monthly_income = annual_income / 12 if annual_income else 0
 
     # ---------------- USER PROFILE ---------------- #
-    profile = profiles_col.find_one({"user_id": user_id})
     if not profile:
         profile = {}
         if user.get("annual_income"):
@@ -69,11 +76,8 @@ def dashboard(user=Depends(get_current_user)):
     }
 
     # ---------------- TRANSACTIONS ---------------- #
-    all_txns = list(transactions_col.find({
-        "user_id": user_id
-    }))
-
-    total_expense = sum(t.get("amount", 0) for t in all_txns)
+    totals = txn_facets["total"][0] if txn_facets["total"] else {"amount": 0, "count": 0}
+    total_expense = totals["amount"]
 
     savings = monthly_income - total_expense
     savings_percentage = (
@@ -81,27 +85,18 @@ def dashboard(user=Depends(get_current_user)):
     )
 
     health_score = calculate_health_score(
-        savings_percentage, total_expense, monthly_income, user_profile, all_txns
+        savings_percentage, total_expense, monthly_income, user_profile,
+        [c["amount"] for c in txn_facets["by_category"]], totals["count"],
+        recent_anomalies_count
     )
 
     # ---------------- CATEGORY BREAKDOWN ---------------- #
-    category_data = {}
-    for t in all_txns:
-        cat = t.get("category", "other")
-        category_data[cat] = category_data.get(cat, 0) + t.get("amount", 0)
-
     top_categories = [
-        {"name": k, "amount": round(v, 2)}
-        for k, v in sorted(category_data.items(), key=lambda x: x[1], reverse=True)[:5]
+        {"name": c["_id"], "amount": round(c["amount"], 2)}
+        for c in heapq.nlargest(5, txn_facets["by_category"], key=itemgetter("amount"))
     ]
 
     # ---------------- RECENT TRANSACTIONS ---------------- #
-    recent_transactions = list(
-        transactions_col.find({"user_id": user_id})
-        .sort("date", -1)
-        .limit(5)
-    )
-
     for t in recent_transactions:
         t["_id"] = str(t["_id"])
         # Ensure anomaly fields are present
@@ -111,16 +106,8 @@ def dashboard(user=Depends(get_current_user)):
             t["anomaly_severity"] = "low"
 
     # ---------------- ANOMALIES ---------------- #
-    anomalies_col = transactions_col.database["anomalies"]
-    
-    # Get all anomalies for this user
-    all_anomalies = list(
-        anomalies_col.find({"user_id": user_id})
-        .sort("created_at", -1)
-    )
-    
     # Get recent anomalies (last 5)
-    recent_anomalies = all_anomalies[:5]
+    recent_anomalies = anomaly_facets["recent"]
     
     anomalies = []
     for anomaly in recent_anomalies:
@@ -137,27 +124,12 @@ def dashboard(user=Depends(get_current_user)):
         anomaly["_id"] = str(anomaly["_id"])
     
     # Count unread anomalies (created in last 7 days, medium/high severity)
-    week_ago = datetime.now() - timedelta(days=7)
-    unread_anomalies_count = sum(
-        1 for a in all_anomalies
-        if a.get("created_at", datetime.now()) >= week_ago
-        and a.get("severity") in ["medium", "high"]
-    )
+    unread_anomalies_count = _facet_count(anomaly_facets, "unread")
     
-    # Get high-severity anomalies for urgent notifications
-    urgent_anomalies = [
-        a for a in all_anomalies
-        if a.get("severity") == "high"
-        and a.get("created_at", datetime.now()) >= week_ago
-    ]
+    # Get high-severity anomalies for urgent notifications (last 7 days)
+    urgent_anomalies = anomaly_facets["urgent"]
 
     # ---------------- ALERTS ---------------- #
-    recent_alerts = list(
-        alerts_col.find({"user_id": user_id})
-        .sort("created_at", -1)
-        .limit(3)
-    )
-
     alerts = [
         {
             "type": alert.get("type", "warning"),
@@ -167,21 +139,21 @@ def dashboard(user=Depends(get_current_user)):
     ]
 
     # ---------------- AI TIPS (ENHANCED) ---------------- #
-    # Calculate monthly expense
-    now = datetime.now()
-    month_ago = now - timedelta(days=30)
-    recent_txns = [
-        t for t in all_txns
-        if datetime.strptime(t.get("date", now.strftime("%Y-%m-%d")), "%Y-%m-%d") >= month_ago
-    ]
-    monthly_expense = sum(t.get("amount", 0) for t in recent_txns)
+    history_stats = stats_from_facets(
+        totals, txn_facets["by_category"], txn_facets["windows"]
+    )
 
-    # Generate enhanced tips with anomaly context
-    tips = tips_engine.generate(
+    # Monthly expense (last 30 days)
+    monthly_expense = history_stats.recent_total
+
+    # Generate enhanced tips with anomaly context (CPU-bound; off the event loop)
+    tips = await asyncio.to_thread(
+        tips_engine.generate,
         user_profile=user_profile,
-        transaction_history=all_txns,
+        history_stats=history_stats,
         monthly_expense=monthly_expense,
-        monthly_income=monthly_income
+        monthly_income=monthly_income,
+        user_id=user_id
     )
     
     # Add anomaly-specific tips to the tips array
@@ -219,87 +191,93 @@ def dashboard(user=Depends(get_current_user)):
     }
 
 # ---------------- HELPERS ---------------- #
-def calculate_health_score(savings_percentage, total_expense, monthly_income, user_profile, all_txns):
+async def _aggregate_one(collection, pipeline):
+    """Run a single-$facet pipeline and return its one result document"""
+    result = await collection.aggregate(pipeline).to_list(1)
+    return result[0]
+
+
+def _facet_count(facets, name):
+    return facets[name][0]["n"] if facets[name] else 0
+
+
+def _transaction_facets(user_id, now):
     """
-    Financial health score (0–100) - Considers user profile and family context
+    Dashboard aggregates over the user's transactions: overall total and
+    count, per-category totals and count, per-category totals for the
+    tips engine's last-30 / 30-60 day windows and the 5 latest transactions.
     """
-    score = 0
-    family_size = user_profile.get("family_size", 1)
-    
-    # Adjust expectations based on family size
-    # Single person: higher savings expected
-    # Family: more expenses expected, adjust thresholds
-    if family_size == 1:
-        savings_thresholds = [30, 20, 10, 0]  # Higher expectations
-        expense_thresholds = [50, 70, 90]
-    elif family_size <= 3:
-        savings_thresholds = [25, 15, 8, 0]  # Moderate expectations
-        expense_thresholds = [60, 80, 95]
-    else:  # 4+ members
-        savings_thresholds = [20, 10, 5, 0]  # More lenient
-        expense_thresholds = [70, 85, 98]
-
-    # 1. Savings Discipline (40 points)
-    if savings_percentage >= savings_thresholds[0]:
-        score += 40
-    elif savings_percentage >= savings_thresholds[1]:
-        score += 30
-    elif savings_percentage >= savings_thresholds[2]:
-        score += 20
-    elif savings_percentage >= savings_thresholds[3]:
-        score += 10
-    else:
-        # Negative savings - penalty
-        score += max(0, 10 + int(savings_percentage))
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "total": total_facet(),
+            "by_category": category_facet(),
+            "windows": windows_facet(now),
+            "recent": [
+                {"$sort": {"date": -1}},
+                {"$limit": 5},
+                {"$project": {
+                    "title": 1, "amount": 1, "category": 1, "date": 1,
+                    "is_anomaly": 1, "anomaly_severity": 1
+                }}
+            ]
+        }}
+    ]
 
-    # 2. Spending Discipline (30 points)
-    if monthly_income > 0:
-        expense_ratio = (total_expense / monthly_income) * 100
-        if expense_ratio <= expense_thresholds[0]:
-            score += 30
-        elif expense_ratio <= expense_thresholds[1]:
-            score += 20
-        elif expense_ratio <= expense_thresholds[2]:
-            score += 10
-        else:
-            # Spending exceeds income significantly
-            score += max(0, 10 - int((expense_ratio - 100) / 10))
 
-    # 3. Expense Consistency (15 points)
-    # Check for recent anomalies
-    anomalies_col = transactions_col.database["anomalies"]
-    user_id = str(user_profile.get("user_id", ""))
-    if user_id:
-        recent_anomalies_count = anomalies_col.count_documents({
-            "user_id": user_id,
-            "created_at": {"$gte": datetime.now() - timedelta(days=30)}
-        })
-        if recent_anomalies_count == 0:
-            score += 15
-        elif recent_anomalies_count <= 2:
-            score += 10
-        elif recent_anomalies_count <= 5:
-            score += 5
+def _anomaly_facets(user_id, now):
+    """
+    Dashboard aggregates over the user's anomalies: 5 latest, unread count
+    (medium/high in the last 7 days), urgent (high, last 7 days) and the
+    30-day count used by the health score.
+    """
+    week_ago = now - timedelta(days=7)
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$sort": {"created_at": -1}},
+        {"$project": {
+            "transaction_id": 1, "amount": 1, "category": 1, "severity": 1,
+            "reason": 1, "anomaly_score": 1, "date": 1, "created_at": 1
+        }},
+        {"$facet": {
+            "recent": [
+                {"$limit": 5}
+            ],
+            "unread": [
+                {"$match": {
+                    "created_at": {"$gte": week_ago},
+                    "severity": {"$in": ["medium", "high"]}
+                }},
+                {"$count": "n"}
+            ],
+            "urgent": [
+                {"$match": {"created_at": {"$gte": week_ago}, "severity": "high"}},
+                {"$limit": 3}
+            ],
+            "count_last_30d": [
+                {"$match": {"created_at": {"$gte": now - timedelta(days=30)}}},
+                {"$count": "n"}
+            ]
+        }}
+    ]
 
-    # 4. Category Balance (15 points)
-    # Check if spending is distributed or concentrated
-    if len(all_txns) >= 5:
-        category_data = {}
-        for t in all_txns:
-            cat = t.get("category", "other")
-            category_data[cat] = category_data.get(cat, 0) + t.get("amount", 0)
-        
-        if total_expense > 0:
-            # Calculate diversity (more categories = better balance)
-            category_count = len(category_data)
-            max_category_ratio = max([v / total_expense for v in category_data.values()]) if category_data else 1
-            
-            # Reward diverse spending, penalize over-concentration
-            if category_count >= 5 and max_category_ratio < 0.5:
-                score += 15
-            elif category_count >= 3 and max_category_ratio < 0.7:
-                score += 10
-            elif category_count >= 2:
-                score += 5
 
-    return min(max(0, score), 100)
+def calculate_health_score(
+    savings_percentage, total_expense, monthly_income, user_profile,
+    category_totals, txn_count, recent_anomalies_count=None
+):
+    """
+    Financial health score (0–100) - Considers user profile and family context.
+    category_totals holds the user's per-category spend, txn_count their
+    number of transactions and recent_anomalies_count their anomaly count
+    over the last 30 days.
+    """
+    return health_score(
+        savings_percentage,
+        total_expense,
+        monthly_income,
+        user_profile.get("family_size", 1),
+        -1 if recent_anomalies_count is None else recent_anomalies_count,
+        txn_count,
+        category_totals
+    )
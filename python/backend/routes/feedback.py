@@ -4,13 +4,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from datetime import datetime
 from bson import ObjectId
+import asyncio
 
 from ..database import (
-    transactions_col, 
-    ai_feedback_col,
-    user_categories_col
+    async_transactions_col,
+    async_ai_feedback_col,
+    async_user_categories_col
 )
-from .transactions import get_current_user   # ✅ FIXED RELATIVE IMPORT
+from ..auth_dep import get_current_user
 
 feedback_router = APIRouter(prefix="/feedback", tags=["AI Feedback"])
 
@@ -27,7 +28,7 @@ class FeedbackInput(BaseModel):
 # ---------------- ROUTE ---------------- #
 
 @feedback_router.post("/")
-def submit_feedback(
+async def submit_feedback(
     data: FeedbackInput,
     user=Depends(get_current_user)
 ):
@@ -35,10 +36,18 @@ def submit_feedback(
     Store user feedback to improve AI predictions later
     """
 
-    txn = transactions_col.find_one({
-        "_id": ObjectId(data.transaction_id),
-        "user_id": str(user["_id"])
-    })
+    txn = await async_transactions_col.find_one(
+        {
+            "_id": ObjectId(data.transaction_id),
+            "user_id": str(user["_id"])
+        },
+        {
+            "title": 1,
+            "ai_analysis.category": 1,
+            "ai_analysis.intent": 1,
+            "ai_analysis.emotion": 1
+        }
+    )
 
     if not txn:
         raise HTTPException(status_code=404, detail="Transaction not found")
@@ -72,11 +81,13 @@ def submit_feedback(
         "created_at": datetime.utcnow()
     }
 
-    ai_feedback_col.insert_one(feedback_doc)
+    # The two writes target different collections (no shared bulk_write),
+    # so they are sent concurrently: one round trip instead of two
+    writes = [async_ai_feedback_col.insert_one(feedback_doc)]
 
     # 🔁 LEARNING: Store custom category for keyword expansion
     if data.corrected_category and data.corrected_category.lower() != "other":
-        user_categories_col.update_one(
+        writes.append(async_user_categories_col.update_one(
             {
                 "user_id": str(user["_id"]),
                 "category": data.corrected_category.lower()
@@ -90,7 +101,9 @@ def submit_feedback(
                 }
             },
             upsert=True
-        )
+        ))
+
+    await asyncio.gather(*writes)
 
     return {
         "message": "Feedback recorded successfully",
@@ -1,41 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import Optional
-from bson import ObjectId
 from datetime import datetime
-import jwt
-import os
-from dotenv import load_dotenv
+from pymongo import ReturnDocument
+import asyncio
+import time
 
-from ..database import users_col, profiles_col   # ✅ FIXED IMPORT
+from ..auth_dep import forget_user, get_current_user
+from ..database import PROFILE_PROJECTION, async_users_col, async_profiles_col
+from ..profile_cache import forget_profile, remember_profile
 
 # ---------------- CONFIG ---------------- #
-load_dotenv()
-
-JWT_SECRET = os.getenv("JWT_SECRET")
-JWT_ALGO = os.getenv("JWT_ALGO", "HS256")
-
-if not JWT_SECRET:
-    raise RuntimeError("JWT_SECRET not set in environment")
-
 profile_router = APIRouter()
 
-# ---------------- AUTH DEPENDENCY ---------------- #
-def get_current_user(authorization: str = Header(...)):
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise Exception("Invalid auth scheme")
-        
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
-        user = users_col.find_one({"_id": ObjectId(payload["user_id"])})
-        
-        if not user:
-            raise Exception("User not found")
-        return user
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
 # ---------------- SCHEMAS ---------------- #
 class ProfileUpdate(BaseModel):
     gender: Optional[str] = None
@@ -47,23 +24,36 @@ class ProfileUpdate(BaseModel):
 
 # ---------------- ROUTES ---------------- #
 @profile_router.get("/")
-def get_profile(user=Depends(get_current_user)):
+async def get_profile(user=Depends(get_current_user)):
     """Get user profile information"""
-    profile = profiles_col.find_one({"user_id": str(user["_id"])})
-
-    if not profile:
-        profile = {
-            "user_id": str(user["_id"]),
-            "gender": "",
-            "company": "",
-            "annual_income": user.get("annual_income", 0),
-            "family_members": 1,
-            "city": "",
-            "has_pets": False,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        profiles_col.insert_one(profile)
+    # Plain read for existing profiles; only a first access upserts the
+    # default profile. profiles.user_id is unique, so concurrent first
+    # accesses converge on one document
+    now = datetime.utcnow()
+    read_started = time.monotonic()
+    profile = await async_profiles_col.find_one({"user_id": str(user["_id"])})
+    if profile is None:
+        profile = await async_profiles_col.find_one_and_update(
+            {"user_id": str(user["_id"])},
+            {"$setOnInsert": {
+                "gender": "",
+                "company": "",
+                "annual_income": user.get("annual_income", 0),
+                "family_members": 1,
+                "city": "",
+                "has_pets": False,
+                "created_at": now,
+                "updated_at": now
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    # May have just been created, so refresh the routes' cached copy
+    remember_profile(
+        str(user["_id"]),
+        {k: profile[k] for k in PROFILE_PROJECTION if k in profile},
+        read_started
+    )
 
     profile["_id"] = str(profile["_id"])
     profile["name"] = user.get("name", "")
@@ -73,7 +63,7 @@ def get_profile(user=Depends(get_current_user)):
 
 
 @profile_router.put("/")
-def update_profile(data: ProfileUpdate, user=Depends(get_current_user)):
+async def update_profile(data: ProfileUpdate, user=Depends(get_current_user)):
     """Update user profile"""
     update_data = {}
 
@@ -83,10 +73,6 @@ def update_profile(data: ProfileUpdate, user=Depends(get_current_user)):
         update_data["company"] = data.company
     if data.annual_income is not None:
         update_data["annual_income"] = data.annual_income
-        users_col.update_one(
-            {"_id": user["_id"]},
-            {"$set": {"annual_income": data.annual_income}}
-        )
     if data.family_members is not None:
         update_data["family_members"] = data.family_members
     if data.city is not None:
@@ -94,19 +80,27 @@ def update_profile(data: ProfileUpdate, user=Depends(get_current_user)):
     if data.has_pets is not None:
         update_data["has_pets"] = data.has_pets
 
-    update_data["updated_at"] = datetime.utcnow()
-
-    existing_profile = profiles_col.find_one({"user_id": str(user["_id"])})
-
-    if existing_profile:
-        profiles_col.update_one(
-            {"user_id": str(user["_id"])},
-            {"$set": update_data}
-        )
-    else:
-        update_data["user_id"] = str(user["_id"])
-        update_data["created_at"] = datetime.utcnow()
-        profiles_col.insert_one(update_data)
+    now = datetime.utcnow()
+    update_data["updated_at"] = now
+
+    # Update or create in one upsert (no find_one pre-read)
+    writes = [async_profiles_col.update_one(
+        {"user_id": str(user["_id"])},
+        {
+            "$set": update_data,
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
+    )]
+    if data.annual_income is not None:
+        writes.append(async_users_col.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"annual_income": data.annual_income}}
+        ))
+    await asyncio.gather(*writes)
+    forget_profile(str(user["_id"]))
+    if data.annual_income is not None:
+        forget_user(user["_id"])
 
     return {
         "message": "Profile updated successfully",
@@ -1,54 +1,49 @@
-from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
-import jwt
-import re
-import os
 from bson import ObjectId
-from dotenv import load_dotenv
+import asyncio
+import re
+import time
+
+try:
+    import re2 as sms_re   # google-re2: linear-time matching, no backtracking
+except ImportError:  # optional dependency
+    sms_re = re
 
+from ..auth_dep import get_current_user
 from ..database import (
-    transactions_col,
-    users_col,
-    profiles_col,
-    alerts_col,
-    ai_feedback_col,
-    user_categories_col
+    async_transactions_col,
+    async_profiles_col,
+    async_anomalies_col,
+    async_alerts_col,
+    PROFILE_PROJECTION,
+    async_ai_feedback_col,
+    async_user_categories_col
 )
-from ..services.ai_service import AIService
+from ..profile_cache import cached_profile, remember_profile
+from ..services.ai_service import AIService, get_ai, monthly_cutoff
 
 # --------------------------------------------------
 # CONFIG
 # --------------------------------------------------
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-ENV_PATH = os.path.join(BASE_DIR, ".env")
-load_dotenv(ENV_PATH)
-
-JWT_SECRET = os.getenv("JWT_SECRET")
-JWT_ALGO = os.getenv("JWT_ALGO", "HS256")
-
 transactions_router = APIRouter()
-ai_service = AIService()
 
-# --------------------------------------------------
-# AUTH
-# --------------------------------------------------
-def get_current_user(authorization: str = Header(...)):
-    try:
-        scheme, token = authorization.split()
-        if scheme.lower() != "bearer":
-            raise Exception()
-
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
-        user = users_col.find_one({"_id": ObjectId(payload["user_id"])})
-
-        if not user:
-            raise Exception()
-
-        return user
-    except Exception:
-        raise HTTPException(status_code=401, detail="Invalid or missing token")
+# Stored dates must be ISO "YYYY-MM-DD": the dashboard / analytics date
+# windows compare them as strings instead of parsing each one
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Fields the transaction list renders; ai_analysis / raw_text stay in the DB
+TRANSACTION_LIST_PROJECTION = {
+    "title": 1,
+    "amount": 1,
+    "category": 1,
+    "date": 1,
+    "source": 1,
+    "is_anomaly": 1,
+    "anomaly_severity": 1
+}
 
 # --------------------------------------------------
 # SCHEMAS
@@ -66,33 +61,125 @@ class SMSInput(BaseModel):
 # --------------------------------------------------
 # SMS PARSER
 # --------------------------------------------------
+# Inline flags only, so the patterns compile unchanged under re and re2
+SMS_AMOUNT_RE = sms_re.compile(r"((?i:INR)|₹)\s*([\d,]+\.?\d*)")
+
+# Amount and merchant alternated into one pattern so the message is scanned
+# once; only "INR" is case-insensitive, as with the separate patterns
+SMS_RE = sms_re.compile(
+    r"(?P<amount>(?:(?i:INR)|₹)\s*(?P<amount_value>[\d,]+\.?\d*))"
+    r"|(?P<merchant>(?:at|to)\s+(?P<merchant_value>[A-Za-z0-9\s&]+))"
+)
+
 def parse_sms(message: str):
     amount = None
     merchant = None
 
-    amt_match = re.search(r"(INR|₹)\s*([\d,]+\.?\d*)", message, re.I)
-    if amt_match:
-        amount = float(amt_match.group(2).replace(",", ""))
-
-    merchant_match = re.search(r"(?:at|to)\s+([A-Za-z0-9\s&]+)", message)
-    if merchant_match:
-        merchant = merchant_match.group(1).strip()
+    for match in SMS_RE.finditer(message):
+        if match.lastgroup == "amount":
+            if amount is None:
+                amount = float(match.group("amount_value").replace(",", ""))
+        elif merchant is None:
+            merchant = match.group("merchant_value").strip()
+            if amount is None:
+                # The merchant text can swallow a later amount ("to X INR 5")
+                amt_match = SMS_AMOUNT_RE.search(message, match.start())
+                if amt_match:
+                    amount = float(amt_match.group(2).replace(",", ""))
+        if amount is not None and merchant is not None:
+            break
 
     return amount, merchant
 
+# --------------------------------------------------
+# HISTORY + PROFILE
+# --------------------------------------------------
+# Latest transactions fed to the anomaly detector / tips on each insert:
+# covers the 30/60-day tip windows and a per-category baseline, and keeps
+# the read bounded however long the history gets
+HISTORY_LIMIT = 200
+
+# _id is kept: the anomaly detector validates its cached stats against it
+HISTORY_PIPELINE_PROJECTION = {"amount": 1, "category": 1, "date": 1, "_id": 1}
+
+def _history_pipeline(user_id: str):
+    return [
+        {"$match": {"user_id": user_id}},
+        # Walks the (user_id, date desc) index
+        {"$sort": {"date": -1}},
+        {"$limit": HISTORY_LIMIT},
+        {"$project": HISTORY_PIPELINE_PROJECTION}
+    ]
+
+def _monthly_pipeline(user_id: str):
+    """
+    Total of the last 30 days (same window as services.ai_service.monthly_spend),
+    summed server-side over a (user_id, date) index range, so it is not
+    limited to the HISTORY_LIMIT rows. ISO date strings range-scan like dates.
+    """
+    return [
+        {"$match": {"user_id": user_id, "date": {"$gt": monthly_cutoff()}}},
+        {"$group": {"_id": None, "amount": {"$sum": "$amount"}}},
+        {"$project": {"_id": 0, "_monthly": "$amount"}}
+    ]
+
+async def load_history_and_profile(user_id: str):
+    """
+    The user's latest HISTORY_LIMIT transactions (amount / category / date,
+    oldest first), profile and 30-day spend in one aggregation round trip.
+    With a cached profile it starts from the transactions; otherwise from
+    the profile lookup (which is then cached), with the transaction
+    branches appended via $unionWith.
+    Returns (history list, profile dict or None, monthly expense).
+    """
+    monthly = {"$unionWith": {
+        "coll": async_transactions_col.name,
+        "pipeline": _monthly_pipeline(user_id)
+    }}
+    hit, profile = cached_profile(user_id)
+    read_started = time.monotonic()
+    if hit:
+        cursor = async_transactions_col.aggregate([*_history_pipeline(user_id), monthly])
+    else:
+        cursor = async_profiles_col.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$limit": 1},
+            {"$project": {**PROFILE_PROJECTION, "_id": 0, "_profile": {"$literal": True}}},
+            {"$unionWith": {
+                "coll": async_transactions_col.name,
+                "pipeline": _history_pipeline(user_id)
+            }},
+            monthly
+        ])
+    docs = await cursor.to_list(None)
+
+    history = []
+    monthly_expense = 0
+    for doc in docs:
+        if "_monthly" in doc:
+            monthly_expense = doc["_monthly"]
+        elif doc.pop("_profile", False):
+            profile = doc
+        else:
+            history.append(doc)
+    history.reverse()
+    if not hit:
+        remember_profile(user_id, profile, read_started)
+    return history, profile, monthly_expense
+
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
 
 # ✅ FIXED: FRONTEND EXPECTS { transactions: [...] }
 @transactions_router.get("/")
-def get_transactions(user=Depends(get_current_user)):
-    data = list(
-        transactions_col.find(
-            {"user_id": str(user["_id"])},
-            {"ai_analysis": 0}  # remove heavy field
-        )
-    )
+async def get_transactions(user=Depends(get_current_user)):
+    # Served by the (user_id, date desc) index from database.ensure_indexes()
+    # (user_id prefix); the projection keeps ai_analysis / raw_text in the DB
+    data = await async_transactions_col.find(
+        {"user_id": str(user["_id"])},
+        TRANSACTION_LIST_PROJECTION
+    ).to_list(None)
 
     for tx in data:
         tx["_id"] = str(tx["_id"])
@@ -105,17 +192,20 @@ def get_transactions(user=Depends(get_current_user)):
 # ADD TRANSACTION
 # --------------------------------------------------
 @transactions_router.post("/add")
-def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
+async def add_transaction(
+    data: TransactionCreate,
+    user=Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai)
+):
     user_id = str(user["_id"])
+    # One timestamp for every document this request writes
+    now = datetime.utcnow()
+
+    if not ISO_DATE.fullmatch(data.date):
+        raise HTTPException(status_code=400, detail="date must be in YYYY-MM-DD format")
     
-    # Fetch user history for anomaly detection
-    history = list(transactions_col.find(
-        {"user_id": user_id},
-        {"amount": 1, "category": 1, "date": 1, "_id": 0}
-    ))
-    
-    # Fetch user profile
-    profile = profiles_col.find_one({"user_id": user_id})
+    # Fetch user history (for anomaly detection) and profile
+    history, profile, monthly_expense = await load_history_and_profile(user_id)
     if not profile:
         # Fallback to user document
         profile = {}
@@ -131,14 +221,16 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
         "family_size": profile.get("family_members", 1)
     }
 
-    # AI Analysis with full context (including user_id for adaptive learning)
-    ai_result = ai_service.analyze_transaction(
+    # AI Analysis with full context (including user_id for adaptive learning);
+    # Motor-backed keyword lookup, CPU-bound stages off the event loop
+    ai_result = await ai_service.analyze_transaction_async(
         text=data.title,
         amount=data.amount,
         category=data.category,  # Pass user-provided category if available
         date=data.date,
         user_profile=user_profile,
         history=history,
+        monthly_expense=monthly_expense,
         user_id=user_id
     )
 
@@ -160,7 +252,10 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
     is_anomaly = anomaly_result.get("is_anomaly", False)
     anomaly_severity = anomaly_result.get("severity", "low")
 
+    # The id is generated client-side, so the documents referencing it can be
+    # written concurrently with the transaction itself (one round trip)
     transaction = {
+        "_id": ObjectId(),
         "user_id": user_id,
         "title": data.title,
         "raw_text": data.title,
@@ -172,16 +267,18 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
         "anomaly_severity": anomaly_severity,
         "date": data.date,
         "source": data.source,
-        "created_at": datetime.utcnow()
+        "created_at": now
     }
 
-    result = transactions_col.insert_one(transaction)
-    transaction_id = str(result.inserted_id)
+    transaction_id = str(transaction["_id"])
+    # The anomaly / alert / feedback documents reference the transaction, so
+    # they are only written (concurrently) once its insert has succeeded
+    await async_transactions_col.insert_one(transaction)
+    writes = []
 
     # Store anomaly in MongoDB if detected
     if is_anomaly and anomaly_severity in ["medium", "high"]:
-        anomalies_col = transactions_col.database["anomalies"]
-        anomalies_col.insert_one({
+        writes.append(async_anomalies_col.insert_one({
             "user_id": user_id,
             "transaction_id": transaction_id,
             "amount": data.amount,
@@ -190,20 +287,21 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
             "severity": anomaly_severity,
             "reason": anomaly_result.get("reason", ""),
             "date": data.date,
-            "created_at": datetime.utcnow()
-        })
+            "created_at": now
+        }))
         
         # Create alert for high-severity anomalies
         if anomaly_severity == "high":
-            alerts_col.insert_one({
+            writes.append(async_alerts_col.insert_one({
                 "user_id": user_id,
                 "type": "anomaly",
                 "message": f"⚠️ Anomaly detected: {anomaly_result.get('reason', 'Unusual spending pattern')}",
                 "transaction_id": transaction_id,
-                "created_at": datetime.utcnow()
-            })
+                "created_at": now
+            }))
 
     # 🔁 Store feedback if user manually selected a category (learning)
+    learned_category = False
     if user_selected_category:
         feedback_doc = {
             "user_id": user_id,
@@ -211,13 +309,14 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
             "ai_category": ai_category,
             "user_category": final_category,
             "confidence": ai_result["category"]["confidence"],
-            "created_at": datetime.utcnow()
+            "created_at": now
         }
-        ai_feedback_col.insert_one(feedback_doc)
+        writes.append(async_ai_feedback_col.insert_one(feedback_doc))
         
         # Store custom category for keyword learning
         if user_category and user_category != "other":
-            user_categories_col.update_one(
+            learned_category = True
+            writes.append(async_user_categories_col.update_one(
                 {
                     "user_id": user_id,
                     "category": final_category
@@ -227,15 +326,21 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
                     "$set": {
                         "user_id": user_id,
                         "category": final_category,
-                        "updated_at": datetime.utcnow()
+                        "updated_at": now
                     }
                 },
                 upsert=True
-            )
-            
-            # Clear cache so next transaction uses updated keywords
-            if hasattr(ai_service.categorizer, 'refresh_user_keywords'):
-                ai_service.categorizer.refresh_user_keywords(user_id)
+            ))
+
+    await asyncio.gather(*writes)
+    # Stored, so it can be folded into the detector's cached stats
+    ai_service.record_transaction(user_id, transaction["_id"], data.amount, final_category)
+
+    if learned_category:
+        # Clear cache so next transaction uses updated keywords
+        categorizer = ai_service.categorizer
+        if hasattr(categorizer, 'refresh_user_keywords'):
+            categorizer.refresh_user_keywords(user_id)
 
     # Build response with alert if anomaly detected
     response = {
@@ -253,23 +358,24 @@ def add_transaction(data: TransactionCreate, user=Depends(get_current_user)):
 # ADD FROM SMS
 # --------------------------------------------------
 @transactions_router.post("/from-sms")
-def add_from_sms(data: SMSInput, user=Depends(get_current_user)):
+async def add_from_sms(
+    data: SMSInput,
+    user=Depends(get_current_user),
+    ai_service: AIService = Depends(get_ai)
+):
     user_id = str(user["_id"])
+    # One timestamp for every document this request writes
+    now = datetime.utcnow()
     
     amount, merchant = parse_sms(data.message)
     if not amount:
         raise HTTPException(status_code=400, detail="Amount not found")
 
     title = merchant or "Unknown"
-    tx_date = datetime.utcnow().strftime("%Y-%m-%d")
+    tx_date = now.strftime("%Y-%m-%d")
     
     # Fetch user history and profile
-    history = list(transactions_col.find(
-        {"user_id": user_id},
-        {"amount": 1, "category": 1, "date": 1, "_id": 0}
-    ))
-    
-    profile = profiles_col.find_one({"user_id": user_id})
+    history, profile, monthly_expense = await load_history_and_profile(user_id)
     if not profile:
         profile = {}
         if user.get("annual_income"):
@@ -283,13 +389,15 @@ def add_from_sms(data: SMSInput, user=Depends(get_current_user)):
         "family_size": profile.get("family_members", 1)
     }
 
-    # AI Analysis with full context (including user_id for adaptive learning)
-    ai_result = ai_service.analyze_transaction(
+    # AI Analysis with full context (including user_id for adaptive learning);
+    # Motor-backed keyword lookup, CPU-bound stages off the event loop
+    ai_result = await ai_service.analyze_transaction_async(
         text=title,
         amount=amount,
         date=tx_date,
         user_profile=user_profile,
         history=history,
+        monthly_expense=monthly_expense,
         user_id=user_id
     )
 
@@ -297,7 +405,10 @@ def add_from_sms(data: SMSInput, user=Depends(get_current_user)):
     is_anomaly = anomaly_result.get("is_anomaly", False)
     anomaly_severity = anomaly_result.get("severity", "low")
 
+    # The id is generated client-side, so the documents referencing it can be
+    # written concurrently with the transaction itself (one round trip)
     transaction = {
+        "_id": ObjectId(),
         "user_id": user_id,
         "title": title,
         "raw_text": data.message,
@@ -309,16 +420,18 @@ def add_from_sms(data: SMSInput, user=Depends(get_current_user)):
         "anomaly_severity": anomaly_severity,
         "date": tx_date,
         "source": "sms",
-        "created_at": datetime.utcnow()
+        "created_at": now
     }
 
-    result = transactions_col.insert_one(transaction)
-    transaction_id = str(result.inserted_id)
+    transaction_id = str(transaction["_id"])
+    # The anomaly / alert / feedback documents reference the transaction, so
+    # they are only written (concurrently) once its insert has succeeded
+    await async_transactions_col.insert_one(transaction)
+    writes = []
 
-    # Store anomaly if detected
+    # Store anomaly (and alert) if detected
     if is_anomaly and anomaly_severity in ["medium", "high"]:
-        anomalies_col = transactions_col.database["anomalies"]
-        anomalies_col.insert_one({
+        writes.append(async_anomalies_col.insert_one({
             "user_id": user_id,
             "transaction_id": transaction_id,
             "amount": amount,
@@ -327,17 +440,19 @@ def add_from_sms(data: SMSInput, user=Depends(get_current_user)):
             "severity": anomaly_severity,
             "reason": anomaly_result.get("reason", ""),
             "date": tx_date,
-            "created_at": datetime.utcnow()
-        })
+            "created_at": now
+        }))
         
         if anomaly_severity == "high":
-            alerts_col.insert_one({
+            writes.append(async_alerts_col.insert_one({
                 "user_id": user_id,
                 "type": "anomaly",
                 "message": f"⚠️ Anomaly detected: {anomaly_result.get('reason', 'Unusual spending pattern')}",
                 "transaction_id": transaction_id,
-                "created_at": datetime.utcnow()
-            })
+                "created_at": now
+            }))
+    await asyncio.gather(*writes)
+    ai_service.record_transaction(user_id, transaction["_id"], amount, transaction["category"])
 
     response = {
         "message": "Transaction added from SMS",
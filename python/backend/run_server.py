@@ -8,6 +8,20 @@ import uvicorn
 import os
 import sys
 
+# Faster event loop / HTTP parser when installed (uvloop has no Windows
+# build); uvicorn's "auto" picks whatever is available otherwise
+try:
+    import uvloop  # noqa: F401
+    LOOP = "uvloop"
+except ImportError:  # optional dependency
+    LOOP = "auto"
+
+try:
+    import httptools  # noqa: F401
+    HTTP = "httptools"
+except ImportError:  # optional dependency
+    HTTP = "auto"
+
 # Add parent directory to path
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
@@ -19,7 +33,24 @@ if __name__ == "__main__":
     print("📍 Server will be available at: http://localhost:8000")
     print("📚 API Documentation: http://localhost:8000/docs")
     print("\n" + "="*50 + "\n")
-    
+
+    if os.getenv("APP_ENV") == "prod":
+        # One worker process (event loop + models) per core, no reloader;
+        # WEB_CONCURRENCY overrides the worker count; it is exported so the
+        # workers size their torch thread pools to their share of the cores
+        workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        uvicorn.run(
+            "backend.main:app",
+            host="0.0.0.0",
+            port=8000,
+            workers=workers,
+            loop=LOOP,
+            http=HTTP,
+            log_level="info"
+        )
+        sys.exit(0)
+
     uvicorn.run(
         "backend.main:app",
         host="0.0.0.0",  # Allow connections from any IP
@@ -1,6 +1,11 @@
 # backend/services/ai_service.py
 
+from datetime import datetime, timedelta
+from fastapi import Request
+import asyncio
+import functools
 import numpy as np
+import orjson
 import sys
 import os
 
@@ -12,19 +17,66 @@ if BASE_DIR not in sys.path:
 from ai.categorizer import SemanticCategorizer
 from ai.adaptive_categorizer import AdaptiveCategorizer
 from ai.anomaly_detector import BehaviorAnomalyDetector
+from ai.history_arrays import HistoryArrays
 from ai.tips_engine import TipsEngine
 
 
-def to_python_type(value):
+def _to_python_type(value):
     if isinstance(value, np.generic):
         return value.item()
     if isinstance(value, dict):
-        return {k: to_python_type(v) for k, v in value.items()}
+        return {k: _to_python_type(v) for k, v in value.items()}
     if isinstance(value, list):
-        return [to_python_type(v) for v in value]
+        return [_to_python_type(v) for v in value]
     return value
 
 
+def to_python_type(value):
+    """
+    numpy scalars in a JSON-shaped result -> builtin Python values, so it
+    can be stored with PyMongo. One orjson round trip converts the whole
+    tree in C; anything orjson rejects (e.g. non-string keys) takes the
+    recursive walk instead.
+    """
+    try:
+        return orjson.loads(orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY))
+    except TypeError:
+        return _to_python_type(value)
+
+
+def monthly_cutoff() -> str:
+    """ISO day before the 30-day window: dates after it are inside"""
+    return (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+
+
+def monthly_spend(history: list) -> float:
+    """
+    Total amount of the transactions dated within the last 30 days
+    (undated ones count as today). Dates are ISO "YYYY-MM-DD", so they are
+    compared as strings without parsing; a day is inside the window when it
+    is after the day 30 days ago, as with midnight >= now - 30 days.
+    """
+    cutoff = monthly_cutoff()
+    return sum(
+        t.get("amount", 0) for t in history
+        if t.get("date") is None or t["date"] > cutoff
+    )
+
+
+@functools.cache
+def get_ai_service() -> "AIService":
+    """
+    Process-wide AIService. Built once at startup (main.py) so model loading
+    never happens on a request.
+    """
+    return AIService()
+
+
+def get_ai(request: Request) -> "AIService":
+    """Route dependency: the AIService main.py's lifespan put on app.state"""
+    return request.app.state.ai_service
+
+
 class AIService:
     """
     Main AI Service - Orchestrates categorization, anomaly detection, and tips generation.
@@ -46,23 +98,44 @@ class AIService:
         date: str | None = None,
         user_profile: dict | None = None,
         history: list | None = None,
-        user_id: str | None = None
+        monthly_expense: float | None = None,
+        user_id: str | None = None,
+        category_result: dict | None = None
     ):
         """
         Analyze transaction with full AI pipeline:
         1. Category classification
         2. Anomaly detection (if history available)
         3. Tips generation (if profile/history available)
-        
+
+        monthly_expense, when the caller already has the 30-day total (e.g.
+        summed by MongoDB), replaces the one derived from history.
+        category_result, when already computed (analyze_transaction_async),
+        skips step 1.
         All modules are optional and fail-safe.
         """
         try:
             # 1. Category classification (always runs, with adaptive learning if user_id provided)
-            category_result = self.categorizer.categorize(text, user_id=user_id)
+            if category_result is None:
+                category_result = self.categorizer.categorize(text, user_id=user_id)
             
             # Use provided category if available, otherwise use AI result
             final_category = category or category_result.get("category", "other")
             
+            # History-derived inputs, computed in one pass before the stages;
+            # the column view is shared with the anomaly detector
+            history_arrays = None
+            if not history:
+                monthly_expense = None
+            else:
+                try:
+                    history_arrays = HistoryArrays.from_history(history)
+                    if monthly_expense is None:
+                        monthly_expense = monthly_spend(history)
+                except Exception:
+                    # Fail-safe: tips run without the monthly total
+                    pass
+
             # 2. Anomaly detection (optional, requires history)
             anomaly_result = {"is_anomaly": False, "score": 0.0, "reason": "", "severity": "low"}
             if history and len(history) >= 3 and amount and date:
@@ -72,7 +145,9 @@ class AIService:
                         category=final_category,
                         date=date,
                         user_history=history,
-                        user_profile=user_profile or {}
+                        user_profile=user_profile or {},
+                        user_id=user_id,
+                        history_arrays=history_arrays
                     )
                 except Exception as e:
                     # Fail-safe: Continue without anomaly detection
@@ -82,20 +157,7 @@ class AIService:
             tips = []
             if user_profile or history:
                 try:
-                    # Calculate monthly expense if history available
-                    monthly_expense = None
                     monthly_income = None
-                    
-                    if history:
-                        from datetime import datetime, timedelta
-                        now = datetime.now()
-                        month_ago = now - timedelta(days=30)
-                        recent_txns = [
-                            t for t in history
-                            if datetime.strptime(t.get("date", now.strftime("%Y-%m-%d")), "%Y-%m-%d") >= month_ago
-                        ]
-                        monthly_expense = sum(t.get("amount", 0) for t in recent_txns)
-                    
                     if user_profile and user_profile.get("annual_income"):
                         monthly_income = user_profile["annual_income"] / 12
                     
@@ -106,7 +168,8 @@ class AIService:
                         category=final_category,
                         amount=amount,
                         monthly_expense=monthly_expense,
-                        monthly_income=monthly_income
+                        monthly_income=monthly_income,
+                        user_id=user_id
                     )
                 except Exception as e:
                     # Fail-safe: Continue without tips
@@ -133,3 +196,37 @@ class AIService:
                 "anomaly": {"is_anomaly": False, "score": 0.0, "reason": str(e), "severity": "low"},
                 "tips": []
             }
+
+    async def analyze_transaction_async(self, *, text: str, user_id: str | None = None, **kwargs):
+        """
+        analyze_transaction for async routes. Categorization awaits the
+        categorizer's Motor keyword lookup instead of blocking on PyMongo;
+        the CPU-bound remainder runs in a worker thread.
+        """
+        category_result = None
+        if hasattr(self.categorizer, "categorize_async"):
+            try:
+                category_result = await self.categorizer.categorize_async(text, user_id=user_id)
+            except Exception:
+                # Fail-safe: analyze_transaction categorizes synchronously
+                pass
+
+        return await asyncio.to_thread(
+            functools.partial(
+                self.analyze_transaction,
+                text=text,
+                user_id=user_id,
+                category_result=category_result,
+                **kwargs
+            )
+        )
+
+    def record_transaction(self, user_id: str, transaction_id, amount: float, category: str):
+        """
+        Update per-user cached state after a transaction is stored
+        (category as stored). Fail-safe: caches are rebuilt on a miss.
+        """
+        try:
+            self.anomaly_detector.record_transaction(user_id, transaction_id, amount, category)
+        except Exception:
+            pass
@@ -0,0 +1,73 @@
+# backend/services/history_facets.py
+"""
+$facet branches that pre-aggregate a transaction history for the tips
+engine, so routes pass HistoryStats instead of transferring every row.
+"""
+
+from datetime import datetime
+
+from ai.tips_engine import HistoryStats, history_windows
+
+
+def total_facet():
+    """Overall amount and count"""
+    return [
+        {"$group": {
+            "_id": None,
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }}
+    ]
+
+
+def category_facet():
+    """Per-category amount, count and first _id (unsorted)"""
+    return [
+        {"$group": {
+            "_id": {"$ifNull": ["$category", "other"]},
+            "amount": {"$sum": "$amount"},
+            "count": {"$sum": 1},
+            "first": {"$min": "$_id"}
+        }}
+    ]
+
+
+def windows_facet(now: datetime):
+    """
+    Per-category totals for the tips engine's last-30 / 30-60 day windows.
+    Dates are "YYYY-MM-DD", so the windows are string compares; missing
+    dates count as today (as in HistoryStats.from_history)
+    """
+    recent_start, prev_start = (d.isoformat() for d in history_windows(now))
+    return [
+        {"$project": {
+            "category": {"$ifNull": ["$category", "other"]},
+            "amount": 1,
+            "date": {"$ifNull": ["$date", now.date().isoformat()]}
+        }},
+        {"$match": {"date": {"$gte": prev_start}}},
+        {"$group": {
+            "_id": {
+                "category": "$category",
+                "recent": {"$gte": ["$date", recent_start]}
+            },
+            "amount": {"$sum": "$amount"},
+            "first": {"$min": "$_id"}
+        }},
+        {"$sort": {"first": 1}}
+    ]
+
+
+def stats_from_facets(totals: dict, by_category: list, windows: list) -> HistoryStats:
+    """
+    HistoryStats from the total / category / windows facet results, with
+    categories in order of first appearance (smallest _id)
+    """
+    categories = sorted(by_category, key=lambda c: c["first"])
+    return HistoryStats.from_aggregates(
+        totals["count"],
+        totals["amount"],
+        [(c["_id"], c["amount"], c["count"]) for c in categories],
+        [(w["_id"]["category"], w["amount"]) for w in windows if w["_id"]["recent"]],
+        [(w["_id"]["category"], w["amount"]) for w in windows if not w["_id"]["recent"]]
+    )
@@ -0,0 +1,50 @@
+import unittest
+
+from ai.sms_parser import parse_sms
+
+
+class ParseSmsPrecedenceTest(unittest.TestCase):
+    """Earlier patterns win over matches that appear earlier in the text"""
+
+    def test_prefix_currency_amount_wins(self):
+        result = parse_sms("Paid 250₹ at Cafe, bal ₹3000")
+        self.assertEqual(result["amount"], 3000.0)
+
+    def test_suffix_currency_amount_used_alone(self):
+        result = parse_sms("Paid 250₹ at Cafe")
+        self.assertEqual(result["amount"], 250.0)
+
+    def test_rs_amount_matches_lowercased_text(self):
+        result = parse_sms("Debited Rs. 1,250.50 from your account")
+        self.assertEqual(result["amount"], 1250.5)
+
+    def test_connector_merchant_wins(self):
+        result = parse_sms("merchant: amazon, paid to flipkart")
+        self.assertEqual(result["merchant"], "Flipkart")
+
+    def test_labelled_merchant_used_alone(self):
+        result = parse_sms("merchant: amazon")
+        self.assertEqual(result["merchant"], "Amazon")
+
+    def test_dashed_date_wins(self):
+        result = parse_sms("txn on 12/12/2024, posted 01-01-2023")
+        self.assertEqual(result["date"], "2023-01-01")
+
+    def test_slashed_date_used_alone(self):
+        result = parse_sms("txn on 12/12/2024")
+        self.assertEqual(result["date"], "2024-12-12")
+
+    def test_invalid_first_date_is_not_retried(self):
+        result = parse_sms("txn on 31-02-2024, posted 12/12/2024")
+        self.assertIsNone(result["date"])
+
+    def test_no_transaction_data(self):
+        result = parse_sms("hello there")
+        self.assertIsNone(result["amount"])
+        self.assertIsNone(result["merchant"])
+        self.assertIsNone(result["date"])
+        self.assertEqual(result["confidence"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()